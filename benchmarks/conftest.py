@@ -0,0 +1,115 @@
+"""Fixtures for the benchmarks.
+
+The benchmarks use generated calendars of different sizes.
+"""
+import datetime
+import os
+import random
+import sys
+import zoneinfo
+
+import icalendar
+import pytest
+
+HERE = os.path.dirname(__file__) or "."
+REPO = os.path.join(HERE, "..")
+
+sys.path.append(REPO)
+
+SIZES = [10, 100, 1000, 10_000, 100_000, 1_000_000]
+TIMEZONE = "Europe/Berlin"
+
+
+def format_datetime(dt, kind):
+    """Return the parameters and value of a date or datetime property."""
+    if kind == "utc":
+        return "", dt.strftime("%Y%m%dT%H%M%SZ")
+    if kind == "floating":
+        return "", dt.strftime("%Y%m%dT%H%M%S")
+    if kind == "zoned":
+        return ";TZID=America/New_York", dt.strftime("%Y%m%dT%H%M%S")
+    return ";VALUE=DATE", dt.strftime("%Y%m%d")
+
+
+def generate_calendar(events:int, seed:int=0, list_length:int=100) -> bytes:
+    """Generate a calendar with X-WR-TIMEZONE and the number of events.
+
+    The events use UTC, floating and zoned datetimes as well as dates.
+    Every tenth event is recurring with RDATE and EXDATE lists of
+    list_length entries.
+    """
+    rng = random.Random(seed)
+    start = datetime.datetime(2000, 1, 1)
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//x-wr-timezone//benchmark//EN",
+        "X-WR-CALNAME:Benchmark",
+        "X-WR-TIMEZONE:" + TIMEZONE,
+    ]
+    for i in range(events):
+        kind = rng.choice(("utc", "floating", "zoned", "date"))
+        dtstart = start + datetime.timedelta(minutes=rng.randrange(60 * 24 * 365 * 30))
+        dtend = dtstart + datetime.timedelta(hours=1, days=kind == "date")
+        params, value = format_datetime(dtstart, kind)
+        lines.extend([
+            "BEGIN:VEVENT",
+            "UID:event-{}@benchmark".format(i),
+            "DTSTAMP:20240101T000000Z",
+            "SUMMARY:Event number {}".format(i),
+            "DTSTART{}:{}".format(params, value),
+            "DTEND{}:{}".format(*format_datetime(dtend, kind)),
+        ])
+        if i % 10 == 0:
+            lines.append("RRULE:FREQ=WEEKLY;COUNT={}".format(list_length * 2))
+            for name in ("RDATE", "EXDATE"):
+                values = [
+                    format_datetime(dtstart + datetime.timedelta(days=7 * j + (name == "RDATE")), kind)
+                    for j in range(list_length)
+                ]
+                lines.append("{}{}:{}".format(name, values[0][0], ",".join(value for _, value in values)))
+        lines.append("END:VEVENT")
+    lines.append("END:VCALENDAR")
+    return ("\r\n".join(lines) + "\r\n").encode("UTF-8")
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("x-wr-timezone")
+    group.addoption(
+        "--max-events",
+        action="store",
+        dest="max_events",
+        type=int,
+        default=1000,
+        help="The maximum number of events in the generated calendars of the benchmark.",
+    )
+
+
+@pytest.fixture(params=SIZES)
+def events(request, pytestconfig):
+    """The number of events in a generated calendar."""
+    if request.param > pytestconfig.option.max_events:
+        pytest.skip("Use --max-events={} to run this benchmark.".format(request.param))
+    return request.param
+
+
+_calendars = {}
+
+@pytest.fixture()
+def calendar_bytes(events):
+    """The bytes of a generated calendar."""
+    if events not in _calendars:
+        _calendars[events] = generate_calendar(events)
+    return _calendars[events]
+
+
+@pytest.fixture()
+def calendar(calendar_bytes):
+    """A parsed generated calendar."""
+    return icalendar.Calendar.from_ical(calendar_bytes)
+
+
+@pytest.fixture()
+def timezone():
+    """The time zone of the generated calendars."""
+    return zoneinfo.ZoneInfo(TIMEZONE)
@@ -0,0 +1,142 @@
+"""Benchmark the stages of a conversion.
+
+Run these with
+
+    pytest benchmarks
+"""
+import datetime
+import io
+import json
+import subprocess
+import sys
+import zoneinfo
+
+import icalendar
+import pytest
+
+from conftest import REPO
+import x_wr_timezone
+
+
+def test_parse(benchmark, calendar_bytes):
+    """Parse the calendar with icalendar."""
+    benchmark(icalendar.Calendar.from_ical, calendar_bytes)
+
+
+def test_walk(benchmark, calendar, timezone):
+    """Walk the calendar and change the time zone."""
+    benchmark(lambda: x_wr_timezone.UTCChangingWalker(timezone).walk(calendar))
+
+
+def test_to_standard(benchmark, calendar):
+    benchmark(x_wr_timezone.to_standard, calendar)
+
+
+def test_to_standard_lazy(benchmark, calendar):
+    """Convert only the first ten components of the calendar."""
+    benchmark(lambda: x_wr_timezone.to_standard(calendar, lazy=True).subcomponents[:10])
+
+
+def test_to_standard_ical_reuse_bytes(benchmark, calendar_bytes):
+    """Convert the calendar and copy the bytes of the unchanged events."""
+    benchmark(x_wr_timezone.to_standard_ical, calendar_bytes, reuse_bytes=True)
+
+
+def test_to_standard_ical_window(benchmark, calendar_bytes):
+    """Convert only the events of one month."""
+    start = datetime.date(2010, 1, 1)
+    end = datetime.date(2010, 2, 1)
+    benchmark(x_wr_timezone.to_standard_ical, calendar_bytes, window_start=start, window_end=end)
+
+
+def test_serialize(benchmark, calendar):
+    """Serialize the converted calendar."""
+    new_calendar = x_wr_timezone.to_standard(calendar)
+    benchmark(new_calendar.to_ical)
+
+
+def test_to_standard_ical(benchmark, calendar_bytes):
+    """Parse, convert and serialize."""
+    benchmark(x_wr_timezone.to_standard_ical, calendar_bytes, add_timezone_component=True)
+
+
+def test_to_standard_ical_parallel(benchmark, calendar_bytes):
+    """Parse, convert and serialize with all cores."""
+    benchmark.pedantic(
+        x_wr_timezone.to_standard_ical_parallel, (calendar_bytes,), {"add_timezone_component": True},
+        rounds=3)
+
+
+def test_stream(benchmark, calendar_bytes):
+    """Convert with --stream."""
+    benchmark(lambda: b"".join(x_wr_timezone.to_standard_stream(io.BytesIO(calendar_bytes), add_timezone_component=True)))
+
+
+def test_incremental(benchmark, calendar_bytes):
+    """Convert the calendar again after one event changed."""
+    previous_output = x_wr_timezone.to_standard_ical(calendar_bytes, add_timezone_component=True)
+    new_input = calendar_bytes.replace(b"SUMMARY:Event number 0\r\n", b"SUMMARY:Changed\r\n")
+    benchmark(
+        x_wr_timezone.to_standard_incremental, calendar_bytes, previous_output, new_input,
+        add_timezone_component=True)
+
+
+@pytest.mark.parametrize("tzid", ["Europe/Berlin", "America/New_York", "Asia/Kolkata"])
+def test_get_timezone_component(benchmark, tzid):
+    """Create the VTIMEZONE component without a cache."""
+    timezone = zoneinfo.ZoneInfo(tzid)
+    benchmark.pedantic(
+        x_wr_timezone.get_timezone_component, (timezone,),
+        setup=x_wr_timezone.timezone_components.clear,
+        rounds=10)
+
+
+@pytest.mark.parametrize("tzid", ["Europe/Berlin", "America/New_York", "Asia/Kolkata"])
+def test_load_timezone_component(benchmark, tzid, tmp_path):
+    """Parse the VTIMEZONE component stored by another process."""
+    timezone = zoneinfo.ZoneInfo(tzid)
+    x_wr_timezone.TimezoneComponentCache(directory=str(tmp_path)).get(timezone)
+    benchmark.pedantic(
+        lambda: x_wr_timezone.TimezoneComponentCache(directory=str(tmp_path)).get(timezone),
+        rounds=10)
+
+
+@pytest.mark.parametrize("args", [["--version"], ["--help"], ["--no-timezone"]])
+def test_command_line_cold_start(benchmark, args):
+    """Start the command line, this includes the Python interpreter."""
+    command = [sys.executable, "-c", "import x_wr_timezone; x_wr_timezone.main()"] + args
+    benchmark.pedantic(subprocess.run, (command,), dict(input=b"BEGIN:VCALENDAR\r\nEND:VCALENDAR\r\n", check=True, capture_output=True), rounds=10)
+
+
+# The time in microseconds that importing x_wr_timezone may take.
+IMPORT_BUDGET = 100_000
+
+
+def test_import_is_within_budget():
+    """Import the library with python -X importtime, the fastest of several runs counts."""
+    times = []
+    for _ in range(5):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import x_wr_timezone"],
+            capture_output=True, check=True, cwd=REPO)
+        line, = [line for line in result.stderr.decode().splitlines() if line.endswith("| x_wr_timezone")]
+        times.append(int(line.split("|")[1]))
+    assert min(times) < IMPORT_BUDGET
+
+
+def test_worker_request(benchmark):
+    """Convert a small calendar with a running --worker process."""
+    data = b"BEGIN:VCALENDAR\r\nX-WR-TIMEZONE:Europe/Berlin\r\nEND:VCALENDAR\r\n"
+    request = json.dumps({"length": len(data)}).encode() + b"\n" + data
+    command = [sys.executable, "-c", "import x_wr_timezone; x_wr_timezone.main()", "--worker"]
+    process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+    def convert():
+        process.stdin.write(request)
+        process.stdin.flush()
+        header = json.loads(process.stdout.readline())
+        return process.stdout.read(header["length"])
+    try:
+        benchmark(convert)
+    finally:
+        process.stdin.close()
+        process.wait()
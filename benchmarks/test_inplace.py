@@ -0,0 +1,53 @@
+"""Benchmark the conversion with and without copying the components
+and the conversion into bytes in one piece or piece by piece.
+
+The peak memory of one conversion is stored in the extra_info of
+the benchmark, see --benchmark-json.
+"""
+import os
+import tracemalloc
+
+import icalendar
+import pytest
+
+import x_wr_timezone
+
+
+def peak_memory(function, *args, **kw):
+    """Return the peak memory in bytes used while calling the function."""
+    tracemalloc.start()
+    try:
+        function(*args, **kw)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+@pytest.mark.parametrize("inplace", [False, True])
+def test_to_standard_inplace(benchmark, calendar_bytes, inplace):
+    benchmark.extra_info["peak_memory"] = peak_memory(
+        x_wr_timezone.to_standard, icalendar.Calendar.from_ical(calendar_bytes), inplace=inplace)
+    benchmark.pedantic(
+        x_wr_timezone.to_standard,
+        setup=lambda: ((icalendar.Calendar.from_ical(calendar_bytes),), {"inplace": inplace}),
+        rounds=5)
+
+
+def write_to_standard(calendar):
+    """Convert the calendar and write the result in one piece."""
+    with open(os.devnull, "wb") as file:
+        file.write(x_wr_timezone.to_standard(calendar).to_ical())
+
+
+def write_iter_standard_ical(calendar):
+    """Convert the calendar and write the result piece by piece."""
+    with open(os.devnull, "wb") as file:
+        for chunk in x_wr_timezone.iter_standard_ical(calendar):
+            file.write(chunk)
+
+
+@pytest.mark.parametrize("write", [write_to_standard, write_iter_standard_ical])
+def test_write(benchmark, calendar, write):
+    """Convert the calendar and write the result."""
+    benchmark.extra_info["peak_memory"] = peak_memory(write, calendar)
+    benchmark(write, calendar)
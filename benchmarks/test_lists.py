@@ -0,0 +1,37 @@
+"""Benchmark the conversion of long RDATE and EXDATE lists."""
+import datetime
+import timeit
+
+import pytest
+from icalendar.prop import vDDDLists
+
+import x_wr_timezone
+
+
+@pytest.fixture(params=[100, 10_000, 100_000])
+def utc_list(request):
+    start = datetime.datetime(2000, 1, 1, tzinfo=datetime.timezone.utc)
+    return vDDDLists([start + datetime.timedelta(hours=7 * i) for i in range(request.param)])
+
+
+def test_walk_list(benchmark, utc_list, timezone):
+    """Convert the list in one pass."""
+    walker = x_wr_timezone.UTCChangingWalker(timezone)
+    benchmark(walker.walk_value, utc_list)
+
+
+def test_walk_list_value_by_value(benchmark, utc_list, timezone):
+    """Convert the list one value at a time for comparison."""
+    walker = x_wr_timezone.UTCChangingWalker(timezone)
+    benchmark(lambda: vDDDLists([walker.walk_value(ddd.dt) for ddd in utc_list.dts]))
+
+
+def test_walk_list_is_faster_than_value_by_value(timezone):
+    """Fail if the one pass conversion loses its advantage."""
+    start = datetime.datetime(2000, 1, 1, tzinfo=datetime.timezone.utc)
+    utc_list = vDDDLists([start + datetime.timedelta(hours=7 * i) for i in range(20_000)])
+    walker = x_wr_timezone.UTCChangingWalker(timezone)
+    one_pass = min(timeit.repeat(lambda: walker.walk_value(utc_list), number=1, repeat=9))
+    value_by_value = min(timeit.repeat(
+        lambda: vDDDLists([walker.walk_value(ddd.dt) for ddd in utc_list.dts]), number=1, repeat=9))
+    assert one_pass * 2 < value_by_value
@@ -0,0 +1,59 @@
+"""Benchmark how the conversion scales with the number of threads.
+
+The same number of conversions is split among 1 to N threads.
+With a free-threaded Python, the time should go down with more threads.
+With the GIL, it stays about the same.
+The conversions per second are stored in the extra_info of the benchmark,
+see --benchmark-json.
+"""
+import concurrent.futures
+import os
+import sys
+
+import pytest
+
+import x_wr_timezone
+
+CONVERSIONS = 16
+THREADS = sorted({1, 2, 4, 8, os.cpu_count() or 1})
+
+
+def gil_enabled() -> bool:
+    """Whether the Python interpreter runs only one thread at a time."""
+    return getattr(sys, "_is_gil_enabled", lambda: True)()
+
+
+def record_throughput(benchmark):
+    """Store the conversions per second in the extra_info."""
+    benchmark.extra_info["gil_enabled"] = gil_enabled()
+    if benchmark.stats is not None:
+        benchmark.extra_info["conversions_per_second"] = CONVERSIONS / benchmark.stats.stats.mean
+
+
+@pytest.mark.parametrize("threads", THREADS)
+def test_to_standard_threads(benchmark, calendar, threads):
+    """Convert the calendar CONVERSIONS times with the threads."""
+    x_wr_timezone.to_standard(calendar, add_timezone_component=True)
+    with concurrent.futures.ThreadPoolExecutor(threads) as executor:
+        def convert():
+            futures = [
+                executor.submit(x_wr_timezone.to_standard, calendar, add_timezone_component=True)
+                for _ in range(CONVERSIONS)
+            ]
+            for future in futures:
+                future.result()
+        benchmark.pedantic(convert, rounds=3)
+    record_throughput(benchmark)
+
+
+@pytest.mark.parametrize("threads", THREADS)
+def test_to_standard_ical_threads(benchmark, calendar_bytes, threads):
+    """Parse, convert and serialize the calendar CONVERSIONS times with the threads."""
+    x_wr_timezone.to_standard_ical(calendar_bytes, add_timezone_component=True)
+    with concurrent.futures.ThreadPoolExecutor(threads) as executor:
+        def convert():
+            list(executor.map(
+                lambda data: x_wr_timezone.to_standard_ical(data, add_timezone_component=True),
+                [calendar_bytes] * CONVERSIONS))
+        benchmark.pedantic(convert, rounds=3)
+    record_throughput(benchmark)
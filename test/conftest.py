@@ -1,5 +1,6 @@
 """Test and fixture initialization."""
 from typing import Callable
+import asyncio
 import icalendar
 import pytest
 import sys
@@ -7,6 +8,7 @@ import os
 import tempfile
 import shutil
 import subprocess
+from io import BytesIO
 
 HERE = os.path.dirname(__file__) or "."
 REPO = os.path.join(HERE, "..")
@@ -137,17 +139,37 @@ def to_standard_cmd_file(calendar):
         shutil.rmtree(d)
     return icalendar.Calendar.from_ical(output)
 
+def to_standard_stream(calendar):
+    """Use the streaming conversion."""
+    input = BytesIO(calendar.to_ical())
+    output = b"".join(x_wr_timezone.to_standard_stream(input))
+    return icalendar.Calendar.from_ical(output)
+
+def to_standard_stream_async(calendar):
+    """Use the asynchronous streaming conversion."""
+    async def chunks():
+        data = calendar.to_ical()
+        for i in range(0, len(data), 100):
+            yield data[i:i + 100]
+    async def convert():
+        return b"".join([data async for data in x_wr_timezone.to_standard_stream_async(chunks())])
+    return icalendar.Calendar.from_ical(asyncio.run(convert()))
+
 conversions = {
-    "all": [x_wr_timezone.to_standard, to_standard_cmd_stdio, to_standard_cmd_file],
-    "fast": [x_wr_timezone.to_standard],
+    "all": [x_wr_timezone.to_standard, to_standard_cmd_stdio, to_standard_cmd_file, to_standard_stream, to_standard_stream_async],
+    "fast": [x_wr_timezone.to_standard, to_standard_stream, to_standard_stream_async],
     "io": [to_standard_cmd_stdio],
     "file": [to_standard_cmd_file],
+    "stream": [to_standard_stream],
+    "async": [to_standard_stream_async],
 }
 
 @pytest.fixture(params=[
     x_wr_timezone.to_standard,
     to_standard_cmd_stdio,
     to_standard_cmd_file,
+    to_standard_stream,
+    to_standard_stream_async,
 ])
 def to_standard(request, pytestconfig):
     """Change the to_standard() function to test several different methods.
@@ -156,6 +178,8 @@ def to_standard(request, pytestconfig):
     - fast - use x_wr_timezone.to_standard(...)
     - io - use cat ... > x-wr-timezone
     - file - use x-wr-timezone in.ics out.ics
+    - stream - use x_wr_timezone.to_standard_stream(...)
+    - async - use x_wr_timezone.to_standard_stream_async(...)
     - all - all of the above
     """
     to_standard = request.param
@@ -170,7 +194,7 @@ def pytest_addoption(parser):
         "--x-wr-timezone",
         action="store",
         dest="to_standard",
-        choices=("all", "file", "io", "fast"),
+        choices=("all", "file", "io", "fast", "stream", "async"),
         default="fast",
         metavar="MODE",
         help=to_standard.__doc__,
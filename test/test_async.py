@@ -0,0 +1,111 @@
+"""Test the conversion in asyncio applications."""
+import asyncio
+import io
+import concurrent.futures
+import threading
+import time
+
+import pytest
+
+from x_wr_timezone import (
+    AsyncConverter,
+    to_standard,
+    to_standard_async,
+    to_standard_ical,
+    to_standard_ical_async,
+    to_standard_stream,
+    to_standard_stream_async,
+)
+
+NAME = "single-events-DTSTART-DTEND.in.ics"
+
+
+def test_to_standard_async(calendars):
+    calendar = calendars[NAME].as_icalendar()
+    result = asyncio.run(to_standard_async(calendar, add_timezone_component=True))
+    assert result == to_standard(calendar, add_timezone_component=True)
+
+
+def test_to_standard_ical_async(calendars):
+    data = calendars[NAME].as_bytes()
+    assert asyncio.run(to_standard_ical_async(data)) == to_standard_ical(data)
+
+
+async def convert_stream(source, **options):
+    """Return the bytes of the converted stream."""
+    return b"".join([data async for data in to_standard_stream_async(source, **options)])
+
+
+@pytest.mark.parametrize("add_timezone_component", [True, False])
+@pytest.mark.parametrize("batch_size", [1, 65536])
+def test_stream_reader(calendars, add_timezone_component, batch_size):
+    data = calendars[NAME].as_bytes()
+    async def convert():
+        reader = asyncio.StreamReader()
+        reader.feed_data(data)
+        reader.feed_eof()
+        return await convert_stream(
+            reader, add_timezone_component=add_timezone_component, batch_size=batch_size)
+    result = asyncio.run(convert())
+    assert result == b"".join(
+        to_standard_stream(io.BytesIO(data), add_timezone_component=add_timezone_component))
+
+
+def test_stream_reader_with_lines_longer_than_its_limit(calendars):
+    data = calendars[NAME].as_bytes().replace(
+        b"BEGIN:VEVENT\r\n", b"BEGIN:VEVENT\r\nDESCRIPTION:" + b"x" * 100_000 + b"\r\n", 1)
+    async def convert():
+        reader = asyncio.StreamReader()
+        reader.feed_data(data)
+        reader.feed_eof()
+        return await convert_stream(reader)
+    assert asyncio.run(convert()) == b"".join(to_standard_stream(io.BytesIO(data)))
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 1000])
+def test_async_iterable(calendar_pair, chunk_size):
+    data = calendar_pair.input.as_bytes()
+    async def chunks():
+        for i in range(0, len(data), chunk_size):
+            yield data[i:i + chunk_size]
+    result = asyncio.run(convert_stream(chunks()))
+    assert result == b"".join(to_standard_stream(io.BytesIO(data)))
+
+
+def test_calendar_without_x_wr_timezone_passes_through(calendars):
+    data = calendars["single-events-DTSTART-DTEND.in.ics"].as_bytes().replace(b"X-WR-TIMEZONE", b"X-WR-CALNAME")
+    async def chunks():
+        yield data
+    assert asyncio.run(convert_stream(chunks())) == data
+
+
+def test_concurrency_is_limited():
+    running = 0
+    most = 0
+    lock = threading.Lock()
+    def work():
+        nonlocal running, most
+        with lock:
+            running += 1
+            most = max(most, running)
+        time.sleep(0.02)
+        with lock:
+            running -= 1
+    async def run():
+        with concurrent.futures.ThreadPoolExecutor(8) as executor:
+            converter = AsyncConverter(executor, max_concurrency=2)
+            await asyncio.gather(*[converter.run(work) for _ in range(8)])
+    asyncio.run(run())
+    assert most == 2
+
+
+def test_the_event_loop_is_not_blocked():
+    event = threading.Event()
+    async def run():
+        converter = AsyncConverter()
+        task = asyncio.ensure_future(converter.run(event.wait, 5))
+        await asyncio.sleep(0)
+        assert not task.done()
+        event.set()
+        return await task
+    assert asyncio.run(run())
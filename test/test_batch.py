@@ -0,0 +1,87 @@
+"""Test the conversion of many files at once."""
+import os
+import icalendar
+import pytest
+
+import x_wr_timezone
+from conftest import CALENDARS_FOLDER
+
+
+@pytest.fixture()
+def output_dir(tmp_path):
+    return tmp_path / "out"
+
+
+@pytest.mark.parametrize("jobs", ["1", "2"])
+def test_convert_directory(cli_runner, calendars, output_dir, jobs):
+    """All the .ics files of a directory are converted."""
+    result = cli_runner.invoke(x_wr_timezone.main, ["--no-timezone", "-j", jobs, "-o", str(output_dir), CALENDARS_FOLDER])
+    assert result.exit_code == 0, result.output
+    names = sorted(os.listdir(output_dir))
+    assert names == sorted(name for name in os.listdir(CALENDARS_FOLDER) if name.endswith(".ics"))
+    for name in names:
+        output = icalendar.Calendar.from_ical((output_dir / name).read_bytes())
+        expected = x_wr_timezone.to_standard(calendars[name].as_icalendar())
+        assert output == expected, name
+
+
+def test_convert_several_files(cli_runner, calendars, output_dir):
+    files = [calendars[name].path for name in ("rdate-hackerpublicradio.in.ics", "single-event-no-tz.in.ics")]
+    result = cli_runner.invoke(x_wr_timezone.main, ["-o", str(output_dir)] + files)
+    assert result.exit_code == 0, result.output
+    assert sorted(os.listdir(output_dir)) == ["rdate-hackerpublicradio.in.ics", "single-event-no-tz.in.ics"]
+    output = icalendar.Calendar.from_ical((output_dir / "single-event-no-tz.in.ics").read_bytes())
+    assert len(output.walk("VTIMEZONE")) == 1
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_failures_do_not_stop_the_batch(tmp_path, calendars, output_dir, jobs):
+    broken = tmp_path / "broken.ics"
+    broken.write_bytes(b"not a calendar")
+    good = calendars["rdate-hackerpublicradio.in.ics"].path
+    results = dict(x_wr_timezone.convert_files([str(broken), good], str(output_dir), jobs))
+    assert results[good] is None
+    assert isinstance(results[str(broken)], Exception)
+    assert os.listdir(output_dir) == ["rdate-hackerpublicradio.in.ics"]
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_files_with_the_same_name_are_not_overwritten(tmp_path, calendars, output_dir, jobs):
+    other = tmp_path / "other"
+    other.mkdir()
+    first = calendars["rdate-hackerpublicradio.in.ics"].path
+    second = str(other / "rdate-hackerpublicradio.in.ics")
+    with open(second, "wb") as file:
+        file.write(b"BEGIN:VCALENDAR\r\nEND:VCALENDAR\r\n")
+    results = dict(x_wr_timezone.convert_files([first, second], str(output_dir), jobs))
+    assert results[first] is None
+    assert isinstance(results[second], ValueError)
+    assert (output_dir / "rdate-hackerpublicradio.in.ics").read_bytes() != b"BEGIN:VCALENDAR\r\nEND:VCALENDAR\r\n"
+
+
+def test_files_with_the_same_name_are_reported(cli_runner, calendars, tmp_path, output_dir):
+    path = calendars["rdate-hackerpublicradio.in.ics"].path
+    copy = tmp_path / "rdate-hackerpublicradio.in.ics"
+    copy.write_bytes(calendars["rdate-hackerpublicradio.in.ics"].as_bytes())
+    result = cli_runner.invoke(x_wr_timezone.main, ["-o", str(output_dir), path, str(copy)])
+    assert result.exit_code == 1
+    assert "same name" in result.output
+
+
+def test_the_same_file_twice_is_converted_once(calendars, output_dir):
+    path = calendars["rdate-hackerpublicradio.in.ics"].path
+    assert list(x_wr_timezone.convert_files([path, path], str(output_dir), 1)) == [(path, None)]
+
+
+def test_failures_are_reported(cli_runner, tmp_path, output_dir):
+    broken = tmp_path / "broken.ics"
+    broken.write_bytes(b"not a calendar")
+    result = cli_runner.invoke(x_wr_timezone.main, ["-o", str(output_dir), str(broken)])
+    assert result.exit_code == 1
+    assert "broken.ics" in result.output
+
+
+def test_more_than_two_files_need_an_output_directory(cli_runner, calendars):
+    files = [calendar.path for calendar in calendars.values()][:3]
+    result = cli_runner.invoke(x_wr_timezone.main, files)
+    assert result.exit_code == 2
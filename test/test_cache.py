@@ -0,0 +1,84 @@
+"""Test the cache of converted calendars on disk."""
+import os
+import subprocess
+
+import icalendar
+import pytest
+
+import x_wr_timezone
+from x_wr_timezone import ConversionCache, to_standard
+from conftest import EXECUTABLE
+
+
+@pytest.fixture()
+def cache_dir(tmp_path):
+    return str(tmp_path / "cache")
+
+
+def invoke(cli_runner, args):
+    result = cli_runner.invoke(x_wr_timezone.main, args)
+    assert result.exit_code == 0, result.output
+    return result.stdout_bytes
+
+
+def cached_files(cache_dir):
+    return sorted(name for name in os.listdir(cache_dir) if name.endswith(".ics"))
+
+
+def test_result_is_reused(cli_runner, calendars, cache_dir, monkeypatch):
+    path = calendars["single-events-DTSTART-DTEND.in.ics"].path
+    first = invoke(cli_runner, ["--cache-dir", cache_dir, path])
+    assert len(cached_files(cache_dir)) == 1
+    monkeypatch.setattr(x_wr_timezone, "to_standard_ical", None)
+    second = invoke(cli_runner, ["--cache-dir", cache_dir, path])
+    assert first == second
+    assert icalendar.Calendar.from_ical(first) == to_standard(
+        calendars["single-events-DTSTART-DTEND.in.ics"].as_icalendar(), add_timezone_component=True)
+
+
+@pytest.mark.parametrize("options", [["--no-timezone"], ["--timezone", "Europe/Paris"]])
+def test_options_are_part_of_the_key(cli_runner, calendars, cache_dir, options):
+    path = calendars["single-events-DTSTART-DTEND.in.ics"].path
+    first = invoke(cli_runner, ["--cache-dir", cache_dir, path])
+    second = invoke(cli_runner, ["--cache-dir", cache_dir] + options + [path])
+    assert first != second
+    assert len(cached_files(cache_dir)) == 2
+
+
+def test_timezone_option(cli_runner, calendars):
+    path = calendars["single-events-DTSTART-DTEND.in.ics"].path
+    output = invoke(cli_runner, ["--timezone", "Europe/Paris", path])
+    assert b"DTSTART;TZID=Europe/Paris:20211223T030000" in output
+
+
+def test_least_recently_used_files_are_removed(tmp_path):
+    cache = ConversionCache(str(tmp_path), max_size=25)
+    keys = [cache.key(str(i).encode()) for i in range(4)]
+    for i, key in enumerate(keys[:2]):
+        cache.store(key, b"0123456789")
+        os.utime(cache.path(key), (i, i))
+    cache.open(keys[0]).close()
+    cache.store(keys[2], b"0123456789")
+    assert cache.open(keys[1]) is None
+    assert sorted(os.listdir(tmp_path)) == sorted(key + ".ics" for key in (keys[0], keys[2]))
+    cache.store(keys[3], b"0" * 30)
+    assert os.listdir(tmp_path) == []
+
+
+def test_cache_with_files(calendars, tmp_path, cache_dir):
+    """The cached file is copied to the output file."""
+    path = calendars["rdate-hackerpublicradio.in.ics"].path
+    outputs = []
+    for i in range(2):
+        out_path = str(tmp_path / "out{}.ics".format(i))
+        subprocess.check_call([EXECUTABLE, "--cache-dir", cache_dir, path, out_path])
+        with open(out_path, "rb") as file:
+            outputs.append(file.read())
+    assert outputs[0] == outputs[1]
+    assert len(cached_files(cache_dir)) == 1
+
+
+def test_cache_cannot_be_used_with_stream(cli_runner, calendars, cache_dir):
+    path = calendars["rdate-hackerpublicradio.in.ics"].path
+    result = cli_runner.invoke(x_wr_timezone.main, ["--stream", "--cache-dir", cache_dir, path])
+    assert result.exit_code == 2
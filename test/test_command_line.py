@@ -1,6 +1,8 @@
 """Test the command line interfae explicitely"""
 import subprocess
 
+import x_wr_timezone
+
 
 CMD = "x-wr-timezone"
 
@@ -9,3 +11,19 @@ def test_help():
     """Test that a help is being displayed."""
     help = subprocess.check_output([CMD, "--help"])
     assert b'x-wr-timezone' in help
+
+
+def test_the_input_file_can_be_the_output_file(cli_runner, calendars, tmp_path):
+    path = tmp_path / "calendar.ics"
+    data = calendars["single-events-DTSTART-DTEND.in.ics"].as_bytes()
+    path.write_bytes(data)
+    result = cli_runner.invoke(x_wr_timezone.main, [str(path), str(path)])
+    assert result.exit_code == 0, result.output
+    assert path.read_bytes() == x_wr_timezone.to_standard_ical(data, add_timezone_component=True)
+
+
+def test_missing_input_file_is_a_usage_error(cli_runner, tmp_path):
+    result = cli_runner.invoke(x_wr_timezone.main, [str(tmp_path / "missing.ics"), str(tmp_path / "out.ics")])
+    assert result.exit_code == 2
+    assert "does not exist" in result.output
+    assert not (tmp_path / "out.ics").exists()
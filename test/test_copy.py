@@ -58,3 +58,23 @@ def test_components_all_in_there(calendars, calendar_name, property):
     assert len(l2) == len(l3), "no components should be added"
 
 
+@pytest.mark.parametrize("add_timezone_component", [True, False])
+def test_inplace_changes_the_calendar(calendar_pair, add_timezone_component):
+    """inplace=True changes the argument and returns it."""
+    calendar = calendar_pair.input.as_icalendar()
+    events = calendar.walk("VEVENT")
+    expected = to_standard(calendar_pair.input.as_icalendar(), add_timezone_component=add_timezone_component)
+    result = to_standard(calendar, add_timezone_component=add_timezone_component, inplace=True)
+    assert result is calendar
+    assert result == expected
+    assert result.walk("VEVENT") == events
+    assert all(e1 is e2 for e1, e2 in zip(result.walk("VEVENT"), events))
+
+
+def test_inplace_changes_the_events(calendars):
+    calendar = calendars["single-events-DTSTART-DTEND.in.ics"].as_icalendar()
+    event = calendar.walk("VEVENT")[0]
+    start = event["DTSTART"]
+    to_standard(calendar, inplace=True)
+    assert event["DTSTART"] is not start
+    assert event["DTSTART"].dt == start.dt
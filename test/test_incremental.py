@@ -0,0 +1,80 @@
+"""Test the conversion of calendars that changed since their last conversion."""
+import io
+
+import icalendar
+import pytest
+
+from x_wr_timezone import ConversionStats, to_standard_ical, to_standard_incremental, to_standard_stream
+
+NAME = "single-events-DTSTART-DTEND.in.ics"
+OLD_SUMMARY = b"SUMMARY:Google says this is 9PM to 10PM on 12/22/2021"
+NEW_SUMMARY = b"SUMMARY:This event changed."
+
+
+def stream(data, **kw):
+    return b"".join(to_standard_stream(io.BytesIO(data), **kw))
+
+
+@pytest.fixture()
+def previous_input(calendars):
+    return calendars[NAME].as_bytes()
+
+
+@pytest.fixture()
+def new_input(previous_input):
+    assert OLD_SUMMARY in previous_input
+    return previous_input.replace(OLD_SUMMARY, NEW_SUMMARY)
+
+
+@pytest.mark.parametrize("add_timezone_component", [True, False])
+@pytest.mark.parametrize("convert", [to_standard_ical, stream])
+def test_only_changed_components_are_converted(previous_input, new_input, convert, add_timezone_component):
+    previous_output = convert(previous_input, add_timezone_component=add_timezone_component)
+    stats = ConversionStats()
+    result = to_standard_incremental(
+        previous_input, previous_output, new_input, add_timezone_component=add_timezone_component, stats=stats)
+    assert stats.counters["components_reused"] == 1
+    assert stats.counters["components_visited"] == 1
+    assert NEW_SUMMARY in result
+    expected = stream(new_input, add_timezone_component=add_timezone_component)
+    assert icalendar.Calendar.from_ical(result) == icalendar.Calendar.from_ical(expected)
+
+
+def test_result_is_that_of_the_stream_without_changes(previous_input):
+    previous_output = stream(previous_input)
+    assert to_standard_incremental(previous_input, previous_output, previous_input) == previous_output
+
+
+def test_new_components_are_converted(previous_input, new_input):
+    previous_output = to_standard_ical(previous_input)
+    new_input = new_input.replace(b"END:VCALENDAR", b"BEGIN:VEVENT\r\nUID:new\r\nDTSTART:20220101T100000Z\r\nEND:VEVENT\r\nEND:VCALENDAR")
+    stats = ConversionStats()
+    result = to_standard_incremental(previous_input, previous_output, new_input, stats=stats)
+    assert stats.counters["components_reused"] == 1
+    assert b"DTSTART;TZID=America/New_York:20220101T050000" in result
+
+
+def test_everything_is_converted_if_x_wr_timezone_changed(previous_input):
+    previous_output = to_standard_ical(previous_input)
+    new_input = previous_input.replace(b"X-WR-TIMEZONE:America/New_York", b"X-WR-TIMEZONE:Europe/Berlin")
+    stats = ConversionStats()
+    result = to_standard_incremental(previous_input, previous_output, new_input, stats=stats)
+    assert "components_reused" not in stats.counters
+    assert result == stream(new_input)
+
+
+def test_everything_is_converted_if_the_output_does_not_match(previous_input, new_input, calendars):
+    previous_output = to_standard_ical(calendars["moved-event-RECURRENCE-ID.in.ics"].as_bytes())
+    stats = ConversionStats()
+    result = to_standard_incremental(previous_input, previous_output, new_input, stats=stats)
+    assert "components_reused" not in stats.counters
+    assert result == stream(new_input)
+
+
+def test_same_uid_in_other_order_does_not_match(previous_input):
+    calendar = icalendar.Calendar.from_ical(to_standard_ical(previous_input))
+    calendar.subcomponents.reverse()
+    swapped = calendar.to_ical()
+    stats = ConversionStats()
+    to_standard_incremental(previous_input, swapped, previous_input, stats=stats)
+    assert "components_reused" not in stats.counters
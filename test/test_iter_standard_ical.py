@@ -0,0 +1,42 @@
+"""Test the conversion of calendars into bytes piece by piece."""
+import icalendar
+import pytest
+
+from x_wr_timezone import X_WR_TIMEZONE, ConversionStats, iter_standard_ical, to_standard
+
+
+@pytest.mark.parametrize("add_timezone_component", [True, False])
+def test_bytes_are_those_of_to_standard(calendar_pair, add_timezone_component):
+    calendar = calendar_pair.input.as_icalendar()
+    expected = to_standard(calendar, add_timezone_component=add_timezone_component).to_ical()
+    chunks = list(iter_standard_ical(calendar, add_timezone_component=add_timezone_component))
+    assert b"".join(chunks) == expected
+    assert len(chunks) == len(calendar.subcomponents) + 2 + add_timezone_component * (X_WR_TIMEZONE in calendar)
+
+
+def test_calendar_is_not_modified(calendars):
+    calendar = calendars["rdate-hackerpublicradio.in.ics"].as_icalendar()
+    before = calendar.to_ical()
+    b"".join(iter_standard_ical(calendar, add_timezone_component=True))
+    assert calendar.to_ical() == before
+
+
+def test_timezone_argument(calendars):
+    calendar = calendars["single-events-DTSTART-DTEND.in.ics"].as_icalendar()
+    result = b"".join(iter_standard_ical(calendar, timezone="Europe/Paris"))
+    assert b"DTSTART;TZID=Europe/Paris:20211222T180000" in result
+
+
+def test_components_are_converted_one_at_a_time(calendars):
+    calendar = calendars["single-events-DTSTART-DTEND.in.ics"].as_icalendar()
+    stats = ConversionStats()
+    chunks = iter_standard_ical(calendar, stats=stats)
+    next(chunks)
+    assert stats.counters["components_visited"] == 0
+    next(chunks)
+    assert stats.counters["components_visited"] == 1
+
+
+def test_empty_calendar():
+    calendar = icalendar.Calendar()
+    assert b"".join(iter_standard_ical(calendar)) == b"BEGIN:VCALENDAR\r\nEND:VCALENDAR\r\n"
@@ -0,0 +1,98 @@
+"""Test the lazy conversion of the components with to_standard(lazy=True)."""
+import copy
+import datetime
+import pickle
+
+import pytest
+from icalendar import Event
+
+from x_wr_timezone import ConversionStats, LazyComponents, to_standard
+
+
+@pytest.mark.parametrize("add_timezone_component", [True, False])
+@pytest.mark.parametrize("inplace", [True, False])
+def test_result_is_the_same(calendar_pair, add_timezone_component, inplace):
+    expected = to_standard(calendar_pair.input.as_icalendar(), add_timezone_component=add_timezone_component)
+    lazy = to_standard(
+        calendar_pair.input.as_icalendar(), add_timezone_component=add_timezone_component,
+        inplace=inplace, lazy=True)
+    assert lazy.to_ical() == expected.to_ical()
+
+
+def test_walk_is_the_same(calendar_pair):
+    expected = to_standard(calendar_pair.input.as_icalendar())
+    lazy = to_standard(calendar_pair.input.as_icalendar(), lazy=True)
+    assert [c.to_ical() for c in lazy.walk()] == [c.to_ical() for c in expected.walk()]
+    assert lazy == expected
+
+
+def test_the_original_is_not_changed(calendar_pair):
+    calendar = calendar_pair.input.as_icalendar()
+    before = calendar.to_ical()
+    to_standard(calendar, lazy=True).to_ical()
+    assert calendar.to_ical() == before
+
+
+@pytest.fixture()
+def calendar(calendars):
+    """A calendar with several events."""
+    return calendars["single-events-DTSTART-DTEND.in.ics"].as_icalendar()
+
+
+def visited(calendar, access):
+    """Return how many components were visited to access the calendar."""
+    stats = ConversionStats()
+    result = to_standard(calendar, lazy=True, stats=stats)
+    assert isinstance(result.subcomponents, LazyComponents)
+    access(result)
+    return stats.counters["components_visited"]
+
+
+def test_components_are_walked_when_accessed(calendar):
+    assert visited(calendar, lambda result: None) == 0
+    assert visited(calendar, lambda result: result.subcomponents[0]) == 1
+    assert visited(calendar, lambda result: result.subcomponents[-1]) == 1
+    assert visited(calendar, lambda result: next(iter(result.subcomponents))) == 1
+    assert visited(calendar, lambda result: result.subcomponents[:2]) == 2
+    assert visited(calendar, lambda result: result.to_ical()) == len(calendar.subcomponents)
+
+
+def test_components_are_walked_once(calendar):
+    assert visited(calendar, lambda result: [result.subcomponents[0] for _ in range(3)]) == 1
+    assert visited(calendar, lambda result: (result.to_ical(), result.to_ical())) == len(calendar.subcomponents)
+
+
+def test_accessed_components_are_the_same_object(calendar):
+    result = to_standard(calendar, lazy=True)
+    assert result.subcomponents[0] is result.subcomponents[0]
+    assert result.subcomponents[1] is list(result.subcomponents)[1]
+
+
+def test_converted_values(calendar):
+    expected = to_standard(calendar)
+    result = to_standard(calendar, lazy=True)
+    assert result.subcomponents[1]["DTSTART"].dt == expected.subcomponents[1]["DTSTART"].dt
+    assert result.subcomponents[1]["DTSTART"].dt.tzinfo is not None
+
+
+def test_changing_the_list(calendar):
+    expected = to_standard(calendar)
+    result = to_standard(calendar, lazy=True)
+    assert result.subcomponents.pop() == expected.subcomponents[-1]
+    event = Event()
+    event.add("DTSTART", datetime.datetime(2020, 1, 1))
+    result.subcomponents.append(event)
+    assert result.subcomponents[-1] is event
+
+
+@pytest.mark.parametrize("duplicate", [copy.copy, copy.deepcopy, lambda l: pickle.loads(pickle.dumps(l))])
+def test_copies_are_lists(calendar, duplicate):
+    expected = to_standard(calendar)
+    result = duplicate(to_standard(calendar, lazy=True).subcomponents)
+    assert type(result) is list
+    assert result == expected.subcomponents
+
+
+def test_lazy_cannot_trim(calendar):
+    with pytest.raises(ValueError):
+        to_standard(calendar, lazy=True, add_timezone_component=True, trim_timezone_component=True)
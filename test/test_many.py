@@ -0,0 +1,70 @@
+"""Test the conversion of many calendars with to_standard_many()."""
+import concurrent.futures
+import itertools
+
+import pytest
+
+from x_wr_timezone import ConversionResult, to_standard, to_standard_many
+
+
+@pytest.fixture(params=["serial", "threads", "processes"])
+def executor(request):
+    """The executors to run the conversions with."""
+    if request.param == "serial":
+        yield None
+    elif request.param == "threads":
+        with concurrent.futures.ThreadPoolExecutor(2) as executor:
+            yield executor
+    else:
+        with concurrent.futures.ProcessPoolExecutor(2) as executor:
+            yield executor
+
+
+@pytest.fixture()
+def inputs(calendars):
+    """Some calendars to convert."""
+    names = sorted(name for name in calendars if name.endswith(".in.ics"))
+    return [calendars[name].as_icalendar() for name in names]
+
+
+@pytest.mark.parametrize("chunksize", [1, 3, 100])
+def test_results_are_those_of_to_standard(executor, inputs, chunksize):
+    results = list(to_standard_many(inputs, executor, chunksize=chunksize, add_timezone_component=True))
+    assert [result.index for result in results] == list(range(len(inputs)))
+    for result, calendar in zip(results, inputs):
+        assert result.error is None
+        assert result.calendar == to_standard(calendar, add_timezone_component=True)
+
+
+def test_unordered_results_have_their_index(executor, inputs):
+    results = list(to_standard_many(inputs, executor, ordered=False, max_pending=2))
+    assert sorted(result.index for result in results) == list(range(len(inputs)))
+    for result in results:
+        assert result.calendar == to_standard(inputs[result.index])
+
+
+def test_errors_do_not_stop_the_conversion(executor, inputs):
+    calendars = [inputs[0], "not a calendar", inputs[1]]
+    results = list(to_standard_many(calendars, executor))
+    assert results[0].error is None and results[2].error is None
+    assert results[1].calendar is None
+    assert isinstance(results[1].error, AttributeError)
+
+
+def test_timezone_is_resolved_once(inputs):
+    result, = to_standard_many(inputs[:1], timezone="Europe/Paris", add_timezone_component=True)
+    assert result.calendar.timezones[0].tz_name == "Europe/Paris"
+    assert result == ConversionResult(0, result.calendar, None)
+
+
+def test_calendars_are_consumed_as_they_are_converted(inputs):
+    consumed = []
+    def calendars():
+        for i in itertools.count():
+            consumed.append(i)
+            yield inputs[0]
+    with concurrent.futures.ThreadPoolExecutor(2) as executor:
+        results = to_standard_many(calendars(), executor, max_pending=3)
+        for result in itertools.islice(results, 5):
+            assert len(consumed) <= result.index + 5
+        results.close()
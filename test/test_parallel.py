@@ -0,0 +1,105 @@
+"""Test the conversion of large calendars with several processes."""
+import icalendar
+import pytest
+
+import x_wr_timezone
+from x_wr_timezone import split_after_events, to_standard_ical, to_standard_ical_parallel
+
+CUSTOM_TIMEZONE = b"""BEGIN:VCALENDAR\r
+VERSION:2.0\r
+X-WR-TIMEZONE:Europe/Berlin\r
+BEGIN:VTIMEZONE\r
+TZID:Custom\r
+BEGIN:STANDARD\r
+DTSTART:19700101T000000\r
+TZOFFSETFROM:+0300\r
+TZOFFSETTO:+0300\r
+TZNAME:CUS\r
+END:STANDARD\r
+END:VTIMEZONE\r
+BEGIN:VEVENT\r
+UID:1\r
+DTSTART:20200101T100000Z\r
+END:VEVENT\r
+BEGIN:VEVENT\r
+UID:2\r
+DTSTART;TZID=Custom:20200101T100000\r
+END:VEVENT\r
+END:VCALENDAR\r
+"""
+
+
+@pytest.mark.parametrize("add_timezone_component", [True, False])
+def test_result_is_that_of_to_standard_ical(calendar_pair, add_timezone_component):
+    data = calendar_pair.input.as_bytes()
+    result = to_standard_ical_parallel(data, add_timezone_component=add_timezone_component, jobs=2, chunk_size=1)
+    expected = to_standard_ical(data, add_timezone_component=add_timezone_component)
+    assert result == expected
+
+
+def test_timezone_components_are_passed_to_the_processes():
+    result = to_standard_ical_parallel(CUSTOM_TIMEZONE, jobs=2, chunk_size=1)
+    assert b"DTSTART;TZID=Custom:20200101T100000" in result
+    assert b"DTSTART;TZID=Europe/Berlin:20200101T110000" in result
+    assert result.count(b"BEGIN:VTIMEZONE") == 1
+
+
+def test_calendar_properties_are_serialized_again():
+    result = to_standard_ical_parallel(CUSTOM_TIMEZONE, jobs=2, chunk_size=1)
+    assert result.startswith(b"BEGIN:VCALENDAR\r\nVERSION:2.0\r\nX-WR-TIMEZONE:Europe/Berlin\r\n")
+    assert result.endswith(b"END:VCALENDAR\r\n")
+
+
+def test_result_does_not_depend_on_the_line_endings_and_folding():
+    data = CUSTOM_TIMEZONE.replace(b"VERSION:2.0", b"X-WR-CALNAME:" + b"x" * 100).replace(b"\r\n", b"\n")
+    result = to_standard_ical_parallel(data, jobs=2, chunk_size=1)
+    assert result == to_standard_ical(data)
+    assert b"\r\n " in result
+    assert result.count(b"\n") == result.count(b"\r\n")
+
+
+def test_properties_between_components_are_kept():
+    data = CUSTOM_TIMEZONE.replace(b"BEGIN:VEVENT\r\nUID:2", b"X-LATE:property\r\nBEGIN:VEVENT\r\nUID:2")
+    result = to_standard_ical_parallel(data, jobs=2, chunk_size=1)
+    assert icalendar.Calendar.from_ical(result)["X-LATE"] == "property"
+
+
+def test_calendar_without_x_wr_timezone_is_not_changed():
+    data = CUSTOM_TIMEZONE.replace(b"X-WR-TIMEZONE:Europe/Berlin\r\n", b"")
+    assert to_standard_ical_parallel(data, jobs=2) is data
+
+
+def test_x_wr_timezone_after_the_components_is_used():
+    data = CUSTOM_TIMEZONE.replace(b"X-WR-TIMEZONE:Europe/Berlin\r\n", b"").replace(
+        b"END:VCALENDAR", b"X-WR-TIMEZONE:Europe/Berlin\r\nEND:VCALENDAR")
+    result = to_standard_ical_parallel(data, jobs=2, chunk_size=1)
+    assert result == to_standard_ical(data)
+    assert b"DTSTART;TZID=Europe/Berlin:20200101T110000" in result
+
+
+@pytest.mark.parametrize("chunk_size", [1, 50, 100, 10_000])
+def test_chunks_end_after_events(chunk_size):
+    body = CUSTOM_TIMEZONE[CUSTOM_TIMEZONE.index(b"BEGIN:VTIMEZONE"):CUSTOM_TIMEZONE.index(b"END:VCALENDAR")]
+    chunks = list(split_after_events(body, chunk_size))
+    assert b"".join(chunks) == body
+    assert all(chunk.endswith(b"END:VEVENT\r\n") for chunk in chunks)
+    assert len(chunks) == (1 if chunk_size > len(body) else 2)
+
+
+def test_folded_lines_are_not_split():
+    body = b"BEGIN:VEVENT\r\nSUMMARY:a\r\n END:VEVENT\r\nEND:VEVENT\r\nBEGIN:VEVENT\r\nEND:VEVENT\r\n"
+    assert list(split_after_events(body, 1)) == [
+        b"BEGIN:VEVENT\r\nSUMMARY:a\r\n END:VEVENT\r\nEND:VEVENT\r\n", b"BEGIN:VEVENT\r\nEND:VEVENT\r\n"]
+
+
+def test_cmd_converts_large_files_in_parallel(cli_runner, calendars, monkeypatch):
+    monkeypatch.setattr(x_wr_timezone, "PARALLEL_MIN_SIZE", 0)
+    calls = []
+    parallel = x_wr_timezone.to_standard_ical_parallel
+    monkeypatch.setattr(x_wr_timezone, "to_standard_ical_parallel", lambda *args, **kw: calls.append(kw) or parallel(*args, **kw))
+    path = calendars["rdate-hackerpublicradio.in.ics"].path
+    result = cli_runner.invoke(x_wr_timezone.main, ["--jobs", "2", path])
+    assert result.exit_code == 0, result.output
+    assert calls[0]["jobs"] == 2
+    assert icalendar.Calendar.from_ical(result.stdout_bytes) == icalendar.Calendar.from_ical(
+        to_standard_ical(calendars["rdate-hackerpublicradio.in.ics"].as_bytes(), add_timezone_component=True))
@@ -0,0 +1,50 @@
+"""Test that calendars without X-WR-TIMEZONE are copied without parsing."""
+import pytest
+
+import x_wr_timezone
+from x_wr_timezone import has_x_wr_timezone, to_standard_ical
+
+
+@pytest.mark.parametrize("data,expected", [
+    (b"BEGIN:VCALENDAR\r\nX-WR-TIMEZONE:UTC\r\nEND:VCALENDAR\r\n", True),
+    (b"BEGIN:VCALENDAR\r\nx-wr-timezone:UTC\r\nEND:VCALENDAR\r\n", True),
+    (b"BEGIN:VCALENDAR\nX-WR-TIME\n ZONE:UTC\nEND:VCALENDAR\n", True),
+    (b"BEGIN:VCALENDAR\r\nX-WR-TIMEZ\r\n\tONE;X=1:UTC\r\nBEGIN:VEVENT\r\nEND:VEVENT\r\nEND:VCALENDAR\r\n", True),
+    (b"BEGIN:VCALENDAR\r\nBEGIN:VEVENT\r\nEND:VEVENT\r\nX-WR-TIMEZONE:UTC\r\nEND:VCALENDAR\r\n", True),
+    (b"BEGIN:VCALENDAR\r\nEND:VCALENDAR\r\n", False),
+    (b"BEGIN:VCALENDAR\r\nX-WR-TIMEZONES:UTC\r\nEND:VCALENDAR\r\n", True),
+    (b"BEGIN:VCALENDAR\r\nX-WR-CALNAME:x-wr-timezone\r\nEND:VCALENDAR\r\n", False),
+    (b"BEGIN:VCALENDAR\r\nBEGIN:VEVENT\r\nx-wr-timezone:UTC\r\nEND:VEVENT\r\nEND:VCALENDAR\r\n", False),
+])
+def test_has_x_wr_timezone(data, expected):
+    assert has_x_wr_timezone(data) == expected
+
+
+def test_calendars_are_recognized(calendars):
+    for calendar in calendars.values():
+        assert has_x_wr_timezone(calendar.as_bytes()) == (b"X-WR-TIMEZONE" in calendar.as_bytes())
+
+
+@pytest.mark.parametrize("add_timezone_component", [True, False])
+def test_calendar_without_x_wr_timezone_is_not_parsed(calendars, monkeypatch, add_timezone_component):
+    data = calendars["x-wr-timezone-not-present.in.ics"].as_bytes()
+    monkeypatch.setattr(x_wr_timezone, "icalendar", None)
+    assert to_standard_ical(data, add_timezone_component=add_timezone_component) is data
+
+
+def test_timezone_argument_converts(calendars):
+    data = calendars["x-wr-timezone-not-present.in.ics"].as_bytes()
+    assert to_standard_ical(data, timezone="Europe/Berlin") != data
+
+
+@pytest.mark.parametrize("data", [b"", b"not a calendar"])
+def test_invalid_input_is_still_an_error(data):
+    with pytest.raises(ValueError):
+        to_standard_ical(data)
+
+
+def test_command_line_copies_the_input(cli_runner, calendars):
+    calendar = calendars["x-wr-timezone-not-present.in.ics"]
+    result = cli_runner.invoke(x_wr_timezone.main, [calendar.path])
+    assert result.exit_code == 0, result.output
+    assert result.stdout_bytes == calendar.as_bytes()
@@ -0,0 +1,116 @@
+"""Test that components which do not change keep the bytes they were parsed from."""
+import datetime
+import zoneinfo
+
+import icalendar
+import pytest
+
+from x_wr_timezone import (
+    SOURCE_ATTRIBUTE,
+    UTCChangingWalker,
+    forget_source,
+    from_ical_keeping_sources,
+    main,
+    to_ical_keeping_sources,
+    to_standard_ical,
+    to_standard_ical_parallel,
+)
+
+# The second event is not changed by the conversion and it is not written
+# the way icalendar writes it.
+CALENDAR = b"""BEGIN:VCALENDAR\r
+VERSION:2.0\r
+X-WR-TIMEZONE:Europe/Berlin\r
+BEGIN:VEVENT\r
+UID:changed\r
+DTSTART:20200101T100000Z\r
+BEGIN:VALARM\r
+TRIGGER:-PT5M\r
+END:VALARM\r
+END:VEVENT\r
+BEGIN:VEVENT\r
+summary:Written by hand with a long line that is folded by the program that wrote i\r
+ t\r
+uid:unchanged\r
+DTSTART;TZID=America/New_York:20200101T100000\r
+BEGIN:VALARM\r
+TRIGGER:-PT5M\r
+END:VALARM\r
+END:VEVENT\r
+END:VCALENDAR\r
+"""
+
+UNCHANGED = CALENDAR[CALENDAR.index(b"BEGIN:VEVENT\r\nsummary"):CALENDAR.rindex(b"END:VCALENDAR")]
+
+
+def test_unchanged_components_keep_their_bytes():
+    result = to_standard_ical(CALENDAR, reuse_bytes=True)
+    assert UNCHANGED in result
+    assert UNCHANGED not in to_standard_ical(CALENDAR)
+
+
+def test_changed_components_are_serialized():
+    result = to_standard_ical(CALENDAR, reuse_bytes=True)
+    assert b"DTSTART;TZID=Europe/Berlin:20200101T110000" in result
+
+
+@pytest.mark.parametrize("add_timezone_component", [True, False])
+def test_result_is_the_same_calendar(calendar_pair, add_timezone_component):
+    data = calendar_pair.input.as_bytes()
+    result = to_standard_ical(data, add_timezone_component=add_timezone_component, reuse_bytes=True)
+    expected = to_standard_ical(data, add_timezone_component=add_timezone_component)
+    assert icalendar.Calendar.from_ical(result) == icalendar.Calendar.from_ical(expected)
+
+
+def test_calendars_without_changes_are_the_same_as_to_ical(calendar_pair):
+    calendar = from_ical_keeping_sources(calendar_pair.input.as_bytes())
+    assert icalendar.Calendar.from_ical(to_ical_keeping_sources(calendar)) == calendar
+
+
+def test_inplace_changes_forget_the_source():
+    calendar = from_ical_keeping_sources(CALENDAR)
+    changed, unchanged = calendar.subcomponents
+    UTCChangingWalker(zoneinfo.ZoneInfo("Europe/Berlin"), inplace=True).walk(calendar)
+    assert SOURCE_ATTRIBUTE not in changed.__dict__
+    assert SOURCE_ATTRIBUTE in unchanged.__dict__
+
+
+@pytest.mark.parametrize("change", [
+    lambda event: event.__setitem__("SUMMARY", "changed"),
+    lambda event: event.pop("UID"),
+    lambda event: event.subcomponents.pop(),
+    lambda event: event.subcomponents[0].__setitem__("TRIGGER", icalendar.vDDDTypes(datetime.timedelta(minutes=-1))),
+    lambda event: event.add_component(icalendar.Alarm()),
+    lambda event: event["DTSTART"].params.__setitem__("X-CHANGED", "yes"),
+    lambda event: setattr(event["DTSTART"], "dt", datetime.datetime(2021, 1, 1, 10, tzinfo=zoneinfo.ZoneInfo("America/New_York"))),
+    forget_source,
+])
+def test_other_changes_are_serialized(change):
+    calendar = from_ical_keeping_sources(CALENDAR)
+    change(calendar.subcomponents[1])
+    result = to_ical_keeping_sources(calendar)
+    assert UNCHANGED not in result
+    assert icalendar.Calendar.from_ical(result) == calendar
+
+
+def test_changes_inside_of_lists_are_serialized():
+    calendar = from_ical_keeping_sources(CALENDAR.replace(b"uid:unchanged", b"uid:unchanged\r\nEXDATE:20200102T100000,20200103T100000"))
+    calendar.subcomponents[1]["EXDATE"].dts.append(icalendar.vDDDTypes(datetime.datetime(2020, 1, 4, 10)))
+    assert b"EXDATE:20200102T100000,20200103T100000,20200104T100000" in to_ical_keeping_sources(calendar)
+
+
+def test_copies_have_no_source():
+    calendar = from_ical_keeping_sources(CALENDAR)
+    assert SOURCE_ATTRIBUTE not in calendar.subcomponents[1].copy().__dict__
+
+
+def test_parallel_conversion_keeps_the_bytes():
+    result = to_standard_ical_parallel(CALENDAR, jobs=2, chunk_size=1, reuse_bytes=True)
+    assert UNCHANGED in result
+    assert icalendar.Calendar.from_ical(result) == icalendar.Calendar.from_ical(to_standard_ical(CALENDAR))
+
+
+def test_cmd_reuse_bytes(cli_runner):
+    result = cli_runner.invoke(main, ["--reuse-bytes"], input=CALENDAR)
+    assert result.exit_code == 0, result.output
+    assert UNCHANGED in result.stdout_bytes
@@ -0,0 +1,188 @@
+"""Test the HTTP server which converts calendars of other servers."""
+import asyncio
+import email.utils
+import http.server
+import threading
+import typing
+
+import icalendar
+import pytest
+
+import x_wr_timezone
+from x_wr_timezone import ConversionServer, to_standard
+
+
+class Upstream(http.server.ThreadingHTTPServer):
+    """A server that stands in for a calendar provider."""
+
+    def __init__(self, calendars):
+        self.calendars = calendars
+        self.requests = 0
+        self.delay = threading.Event()
+        self.delay.set()
+        super().__init__(("127.0.0.1", 0), UpstreamHandler)
+
+    def url(self, name):
+        return "http://127.0.0.1:{}/{}".format(self.server_address[1], name)
+
+
+class UpstreamHandler(http.server.BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        self.server.requests += 1
+        self.server.delay.wait()
+        name = self.path[1:]
+        if name not in self.server.calendars:
+            self.send_error(404)
+            return
+        body = self.server.calendars[name].as_bytes()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture()
+def upstream(calendars):
+    server = Upstream(calendars)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.delay.set()
+    server.shutdown()
+    server.server_close()
+
+
+async def http_get(port, target, headers={}, method="GET"):
+    """Return (status, headers, body) of a GET request."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    request = "{} {} HTTP/1.1\r\nHost: localhost\r\n".format(method, target)
+    for name, value in headers.items():
+        request += "{}: {}\r\n".format(name, value)
+    writer.write(request.encode() + b"\r\n")
+    response = await reader.read()
+    writer.close()
+    head, _, body = response.partition(b"\r\n\r\n")
+    lines = head.decode().split("\r\n")
+    response_headers = dict(line.split(": ", 1) for line in lines[1:])
+    return int(lines[0].split()[1]), response_headers, body
+
+
+def run(coroutine_function, server=None):
+    """Run the function with a started server and its port."""
+    server = server or ConversionServer()
+    async def main():
+        listening = await server.start("127.0.0.1", 0)
+        async with listening:
+            return await coroutine_function(listening.sockets[0].getsockname()[1])
+    return asyncio.run(main())
+
+
+def test_convert_a_calendar(upstream, calendars):
+    name = "single-events-DTSTART-DTEND.in.ics"
+    status, headers, body = run(lambda port: http_get(port, "/?url=" + upstream.url(name)))
+    assert status == 200
+    assert headers["Content-Type"].startswith("text/calendar")
+    expected = to_standard(calendars[name].as_icalendar(), add_timezone_component=True)
+    assert icalendar.Calendar.from_ical(body) == expected
+
+
+def test_options(upstream, calendars):
+    name = "single-events-DTSTART-DTEND.in.ics"
+    target = "/?add_timezone=0&timezone=Europe/Paris&url=" + upstream.url(name)
+    status, headers, body = run(lambda port: http_get(port, target))
+    assert status == 200
+    assert icalendar.Calendar.from_ical(body) == to_standard(calendars[name].as_icalendar(), timezone="Europe/Paris")
+
+
+def test_etag(upstream):
+    target = "/?url=" + upstream.url("rdate-hackerpublicradio.in.ics")
+    async def requests(port):
+        _, headers, _ = await http_get(port, target)
+        return headers["ETag"], await http_get(port, target, {"If-None-Match": headers["ETag"]})
+    etag, (status, headers, body) = run(requests)
+    assert status == 304
+    assert body == b""
+    assert headers["ETag"] == etag
+
+
+def test_if_modified_since(upstream):
+    target = "/?url=" + upstream.url("rdate-hackerpublicradio.in.ics")
+    async def requests(port):
+        _, headers, _ = await http_get(port, target)
+        return (
+            await http_get(port, target, {"If-Modified-Since": headers["Last-Modified"]}),
+            await http_get(port, target, {"If-Modified-Since": email.utils.formatdate(0, usegmt=True)}),
+        )
+    (status1, _, _), (status2, _, _) = run(requests)
+    assert status1 == 304
+    assert status2 == 200
+
+
+def test_conversion_is_cached(upstream, monkeypatch):
+    """The same upstream bytes are converted only once."""
+    server = ConversionServer()
+    target = "/?url=" + upstream.url("rdate-hackerpublicradio.in.ics")
+    async def requests(port):
+        first = await http_get(port, target)
+        monkeypatch.setattr(x_wr_timezone, "to_standard_ical", None)
+        second = await http_get(port, target)
+        return first, second
+    first, second = run(requests, server)
+    assert second[0] == 200
+    assert first[2] == second[2]
+    assert upstream.requests == 2
+
+
+def test_concurrent_requests_share_the_download(upstream):
+    target = "/?url=" + upstream.url("rdate-hackerpublicradio.in.ics")
+    upstream.delay.clear()
+    async def requests(port):
+        requests = [asyncio.ensure_future(http_get(port, target)) for i in range(5)]
+        await asyncio.sleep(0.2)
+        upstream.delay.set()
+        return await asyncio.gather(*requests)
+    responses = run(requests)
+    assert [response[0] for response in responses] == [200] * 5
+    assert upstream.requests == 1
+
+
+@pytest.mark.parametrize("target,status", [
+    ("/", 400),
+    ("/?url=file:///etc/passwd", 400),
+    ("/?url=http://127.0.0.1:1/unreachable.ics", 502),
+])
+def test_errors(target, status):
+    assert run(lambda port: http_get(port, target))[0] == status
+
+
+def test_upstream_error(upstream):
+    assert run(lambda port: http_get(port, "/?url=" + upstream.url("missing.ics")))[0] == 502
+
+
+def test_head_has_the_length_of_the_body(upstream):
+    target = "/?url=" + upstream.url("single-events-DTSTART-DTEND.in.ics")
+    async def request(port):
+        return await http_get(port, target), await http_get(port, target, method="HEAD")
+    (_, get_headers, get_body), (status, head_headers, head_body) = run(request)
+    assert status == 200
+    assert head_body == b""
+    assert head_headers["Content-Length"] == get_headers["Content-Length"] == str(len(get_body))
+
+
+def test_type_hints_can_be_read():
+    typing.get_type_hints(ConversionServer.handle)
+    typing.get_type_hints(ConversionServer.start)
+
+
+@pytest.mark.parametrize("option", [
+    ["--timezone", "UTC"], ["--trim-timezone"], ["--from", "2024-01-01"], ["--until", "2024-01-01"],
+    ["--cache-dir", "cache"], ["--reuse-bytes"], ["--stream"],
+])
+def test_cmd_rejects_options_the_server_ignores(cli_runner, option):
+    result = cli_runner.invoke(x_wr_timezone.main, ["--serve", "0"] + option)
+    assert result.exit_code == 2
+    assert "--serve" in result.output
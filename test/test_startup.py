@@ -0,0 +1,80 @@
+"""Test that the library and the command line only import what they need.
+
+We see the imports with python -X importtime.
+The import time itself is checked in benchmarks/test_conversion.py.
+"""
+import subprocess
+import sys
+
+import pytest
+
+from conftest import REPO
+
+# Modules imported lazily do not show up in the output but the modules they import do.
+HEAVY_MODULES = ["icalendar", "click", "asyncio", "zoneinfo", "http.client", "concurrent.futures.process"]
+
+
+def is_imported(module, times):
+    """Whether the module or one of its submodules was imported."""
+    return any(name == module or name.startswith(module + ".") for name in times)
+
+
+def import_times(code):
+    """Run the code and return the cumulative import times of the modules."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True, check=True, cwd=REPO)
+    times = {}
+    for line in result.stderr.decode().splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, module = line[len("import time:"):].split("|")
+        times[module.strip()] = int(cumulative)
+    return times
+
+
+@pytest.mark.parametrize("code", [
+    "import x_wr_timezone",
+    "import x_wr_timezone; x_wr_timezone.to_standard",
+    "import x_wr_timezone\ntry: x_wr_timezone.main(['--version'])\nexcept SystemExit: pass",
+    "import x_wr_timezone\ntry: x_wr_timezone.main(['--help'])\nexcept SystemExit: pass",
+])
+@pytest.mark.parametrize("module", HEAVY_MODULES)
+def test_heavy_modules_are_not_imported(code, module):
+    """Modules are only imported when they are needed."""
+    if module == "click" and "main" in code:
+        pytest.skip("The command line uses click.")
+    assert not is_imported(module, import_times(code))
+
+
+@pytest.mark.parametrize("calendar,imported", [
+    (b"BEGIN:VCALENDAR\r\nX-WR-TIMEZONE:UTC\r\nEND:VCALENDAR\r\n", True),
+    (b"BEGIN:VCALENDAR\r\nEND:VCALENDAR\r\n", False),
+])
+def test_conversion_imports_icalendar_if_needed(calendar, imported):
+    times = import_times("import x_wr_timezone; x_wr_timezone.to_standard_ical({!r})".format(calendar))
+    assert is_imported("icalendar", times) == imported
+
+
+def test_cached_conversion_does_not_import_icalendar(tmp_path, calendars):
+    """A result from --cache-dir is copied without parsing the calendar."""
+    path = calendars["rdate-hackerpublicradio.in.ics"].path
+    code = "import x_wr_timezone\ntry: x_wr_timezone.main(['--cache-dir', {!r}, {!r}, {!r}])\nexcept SystemExit: pass".format(
+        str(tmp_path / "cache"), path, str(tmp_path / "out.ics"))
+    assert is_imported("icalendar", import_times(code))
+    assert not is_imported("icalendar", import_times(code))
+
+
+def test_no_placeholder_modules_are_imported():
+    """Other libraries get real modules from sys.modules."""
+    code = "import sys, importlib.util, x_wr_timezone; print([n for n, m in sys.modules.items() if isinstance(m, importlib.util._LazyModule)])"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, check=True, cwd=REPO)
+    assert result.stdout.strip() == b"[]"
+
+
+def test_type_hints_can_be_read():
+    import typing
+    import icalendar
+    import x_wr_timezone
+    hints = typing.get_type_hints(x_wr_timezone.to_standard)
+    assert hints["return"] is icalendar.Calendar
@@ -0,0 +1,111 @@
+"""Test the statistics of conversions."""
+import json
+import tracemalloc
+
+import pytest
+
+import x_wr_timezone
+from x_wr_timezone import ConversionStats, TimezoneComponentCache, to_standard, to_standard_ical, to_standard_stream
+
+
+def test_counters(calendars):
+    stats = ConversionStats()
+    calendar = calendars["todo-journal-alarm.in.ics"].as_icalendar()
+    to_standard(calendar, stats=stats)
+    assert stats.counters["components_visited"] == 5
+    assert stats.counters["components_skipped"] == 1
+    assert stats.counters["components_copied"] == 4
+    assert stats.counters["datetimes_converted"] == 5
+    assert stats.counters["values.vDDDTypes"] == 5
+    assert stats.counters["values.datetime"] == 5
+    assert set(stats.stages) == {"walk"}
+
+
+def test_unchanged_datetimes_are_counted(calendars):
+    stats = ConversionStats()
+    to_standard(calendars["moved-event-RECURRENCE-ID.in.ics"].as_icalendar(), stats=stats)
+    assert stats.counters["datetimes_unchanged"] > 0
+    assert stats.counters["datetimes_converted"] > 0
+
+
+def test_statistics_do_not_change_the_result(calendar_pair):
+    stats = ConversionStats()
+    result = to_standard(calendar_pair.input.as_icalendar(), stats=stats, add_timezone_component=True)
+    assert result == to_standard(calendar_pair.input.as_icalendar(), add_timezone_component=True)
+
+
+def test_stages_of_to_standard_ical(calendars, monkeypatch):
+    monkeypatch.setattr(x_wr_timezone, "timezone_components", TimezoneComponentCache())
+    data = calendars["single-events-DTSTART-DTEND.in.ics"].as_bytes()
+    for _ in range(2):
+        stats = ConversionStats()
+        to_standard_ical(data, add_timezone_component=True, stats=stats)
+    assert set(stats.stages) == {"parse", "walk", "timezone_component", "serialize"}
+    assert all(stage["seconds"] >= 0 for stage in stats.stages.values())
+    assert stats.counters["timezone_cache_hits"] == 1
+    assert "timezone_cache_misses" not in stats.counters
+
+
+def test_calendars_without_x_wr_timezone_are_counted():
+    stats = ConversionStats()
+    to_standard_ical(b"BEGIN:VCALENDAR\r\nEND:VCALENDAR\r\n", stats=stats)
+    assert stats.as_dict() == {"counters": {"calendars_not_parsed": 1}, "stages": {}}
+
+
+def test_stream_counts_components(calendars):
+    stats = ConversionStats()
+    with open(calendars["single-events-DTSTART-DTEND.in.ics"].path, "rb") as file:
+        b"".join(to_standard_stream(file, stats=stats))
+    assert stats.counters["components_visited"] == 2
+    assert stats.counters["datetimes_converted"] == 4
+
+
+def test_stage_times_add_up():
+    stats = ConversionStats()
+    for _ in range(2):
+        with stats.stage("stage"):
+            pass
+    assert list(stats.stages) == ["stage"]
+    assert "peak_memory" not in stats.stages["stage"]
+
+
+def test_stage_measures_memory_while_tracing():
+    stats = ConversionStats()
+    tracemalloc.start()
+    try:
+        with stats.stage("stage"):
+            data = bytearray(1_000_000)
+    finally:
+        tracemalloc.stop()
+    assert stats.stages["stage"]["peak_memory"] >= 1_000_000
+    del data
+
+
+def test_stage_memory_does_not_include_the_memory_before_it():
+    stats = ConversionStats()
+    tracemalloc.start()
+    try:
+        data = bytearray(10_000_000)
+        with stats.stage("stage"):
+            pass
+    finally:
+        tracemalloc.stop()
+    assert stats.stages["stage"]["peak_memory"] < 1_000_000
+    del data
+
+
+def test_cmd_stats(cli_runner, calendars):
+    path = calendars["single-events-DTSTART-DTEND.in.ics"].path
+    result = cli_runner.invoke(x_wr_timezone.main, ["--stats", path])
+    assert result.exit_code == 0, result.output
+    stats = json.loads(result.stderr)
+    assert stats["counters"]["datetimes_converted"] == 4
+    assert set(stats["stages"]) == {"read", "parse", "walk", "timezone_component", "serialize"}
+    assert all("peak_memory" in stage for stage in stats["stages"].values())
+    assert not tracemalloc.is_tracing()
+
+
+@pytest.mark.parametrize("option", [["--serve", "8080"], ["--output-dir", "out"]])
+def test_cmd_stats_converts_one_calendar(cli_runner, option):
+    result = cli_runner.invoke(x_wr_timezone.main, ["--stats"] + option)
+    assert result.exit_code == 2
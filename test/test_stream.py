@@ -0,0 +1,61 @@
+"""Test the conversion of calendars one component at a time."""
+from io import BytesIO
+import icalendar
+import pytest
+
+from x_wr_timezone import iter_content_lines, to_standard, to_standard_stream
+
+
+@pytest.mark.parametrize("data,lines", [
+    (b"", []),
+    (b"A:1\r\n", [b"A:1\r\n"]),
+    (b"A:1\r\nB:2\r\n", [b"A:1\r\n", b"B:2\r\n"]),
+    (b"A:1\r\n 2\r\n\t3\r\nB:2", [b"A:1\r\n 2\r\n\t3\r\n", b"B:2"]),
+    (b"A:1\n 2\nB:2\n", [b"A:1\n 2\n", b"B:2\n"]),
+])
+def test_content_lines_keep_the_folding(data, lines):
+    assert list(iter_content_lines(BytesIO(data))) == lines
+
+
+def stream(calendar, **kw):
+    return b"".join(to_standard_stream(BytesIO(calendar.as_bytes()), **kw))
+
+
+@pytest.mark.parametrize("add_timezone_component", [True, False])
+def test_stream_is_the_same_as_to_standard(calendar_pair, add_timezone_component):
+    """The streamed result contains the same calendar."""
+    calendar = calendar_pair.input
+    expected = to_standard(calendar.as_icalendar(), add_timezone_component=add_timezone_component)
+    output = stream(calendar, add_timezone_component=add_timezone_component)
+    assert icalendar.Calendar.from_ical(output) == expected
+
+
+@pytest.mark.parametrize("calendar_name,add_timezone_component", [
+    ("x-wr-timezone-not-present.in.ics", True),
+    ("single-event-x-wr-timezone-not-used.out.ics", False),
+])
+def test_calendars_without_change_are_copied(calendars, calendar_name, add_timezone_component):
+    """Calendars that do not need a change stay byte by byte the same."""
+    calendar = calendars[calendar_name]
+    output = stream(calendar, add_timezone_component=add_timezone_component)
+    assert output == calendar.as_bytes()
+
+
+def test_stream_yields_components_one_by_one(calendars):
+    """We do not wait for the whole calendar to be read."""
+    calendar = calendars["rdate-hackerpublicradio.in.ics"]
+    chunks = list(to_standard_stream(BytesIO(calendar.as_bytes())))
+    assert len(chunks) > len(calendar.as_icalendar().subcomponents)
+
+
+def test_stream_with_a_timezone_argument(calendars):
+    calendar = calendars["single-events-DTSTART-DTEND.in.ics"]
+    output = stream(calendar, timezone="Europe/Paris")
+    assert b"DTSTART;TZID=Europe/Paris:20211223T030000" in output
+
+
+def test_command_line_stream(cal_cmd, calendars):
+    """The --stream option converts the calendar."""
+    calendar = calendars["single-events-DTSTART-DTEND.in.ics"]
+    cal = cal_cmd(["--stream", calendar.filename])
+    assert cal == to_standard(calendar.as_icalendar(), add_timezone_component=True)
@@ -0,0 +1,100 @@
+"""Test that conversions can run in several threads at the same time."""
+import concurrent.futures
+import subprocess
+import sys
+import zoneinfo
+
+import pytest
+from conftest import REPO
+
+from x_wr_timezone import ConversionStats, TimezoneComponentCache, to_standard, to_standard_ical
+
+THREADS = 8
+
+
+@pytest.fixture(autouse=True)
+def switch_often():
+    """Let the threads switch often so that races show up."""
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(interval)
+
+
+def run_in_threads(function, arguments):
+    """Return the results of the function for the arguments computed in threads."""
+    with concurrent.futures.ThreadPoolExecutor(THREADS) as executor:
+        return list(executor.map(function, arguments))
+
+
+@pytest.mark.parametrize("options", [
+    {},
+    {"add_timezone_component": True},
+    {"add_timezone_component": True, "trim_timezone_component": True},
+    {"reuse_bytes": True},
+    {"timezone": "Europe/Berlin", "add_timezone_component": True},
+])
+def test_to_standard_ical(calendars, options):
+    inputs = [calendar.as_bytes() for name, calendar in sorted(calendars.items()) if name.endswith(".in.ics")]
+    expected = [to_standard_ical(data, **options) for data in inputs]
+    assert run_in_threads(lambda data: to_standard_ical(data, **options), inputs * 5) == expected * 5
+
+
+def test_one_calendar_in_many_threads(calendars):
+    calendar = calendars["single-events-DTSTART-DTEND.in.ics"].as_icalendar()
+    before = calendar.to_ical()
+    expected = to_standard(calendar, add_timezone_component=True).to_ical()
+    results = run_in_threads(
+        lambda _: to_standard(calendar, add_timezone_component=True, cache_size=10).to_ical(), range(50))
+    assert results == [expected] * 50
+    assert calendar.to_ical() == before
+
+
+def test_timezone_component_cache():
+    cache = TimezoneComponentCache(max_size=3)
+    timezones = [zoneinfo.ZoneInfo(name) for name in (
+        "Europe/Berlin", "America/New_York", "Asia/Kolkata", "Australia/Sydney", "UTC")]
+    def get(timezone):
+        component, ical = cache.get_entry(timezone, 2020, 2021)
+        assert component.to_ical() == ical
+        assert cache.ical_of(component) in (ical, None)
+        return ical
+    icals = run_in_threads(get, timezones * 40)
+    assert icals == [cache.create(timezone, 2020, 2021).to_ical() for timezone in timezones] * 40
+    assert len(cache.components) == 3
+    assert len(cache.icals) == 3
+
+
+def test_lazy_components_are_walked_once(calendars):
+    calendar = calendars["single-events-DTSTART-DTEND.in.ics"].as_icalendar()
+    expected = [component.to_ical() for component in to_standard(calendar).subcomponents]
+    stats = ConversionStats()
+    lazy = to_standard(calendar, lazy=True, stats=stats)
+    results = run_in_threads(lambda _: list(lazy.subcomponents), range(50))
+    assert all(result == results[0] for result in results)
+    assert all(a is b for result in results for a, b in zip(result, results[0]))
+    assert [component.to_ical() for component in results[0]] == expected
+    assert stats.counters["components_visited"] == len(calendar.walk()) - 1
+
+
+FIRST_USE_IN_THREADS = """
+import concurrent.futures, sys, x_wr_timezone
+assert "icalendar" not in sys.modules
+data = open(sys.argv[1], "rb").read()
+with concurrent.futures.ThreadPoolExecutor({threads}) as executor:
+    futures = [
+        executor.submit(x_wr_timezone.to_standard_ical, data, add_timezone_component=True)
+        for _ in range({threads})
+    ]
+    results = [future.result() for future in futures]
+assert len(set(results)) == 1
+"""
+
+
+@pytest.mark.parametrize("repetition", range(3))
+def test_first_use_in_several_threads(calendars, repetition):
+    """The modules imported on first use are imported once for all threads."""
+    code = FIRST_USE_IN_THREADS.format(threads=THREADS)
+    path = calendars["single-events-DTSTART-DTEND.in.ics"].path
+    result = subprocess.run([sys.executable, "-c", code, path], capture_output=True, cwd=REPO)
+    assert result.returncode == 0, result.stderr.decode()
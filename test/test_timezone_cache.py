@@ -0,0 +1,127 @@
+"""Test the cache of VTIMEZONE components."""
+import datetime
+import os
+import threading
+import zoneinfo
+
+import dateutil.tz
+import icalendar
+import pytest
+import pytz
+
+import x_wr_timezone
+from x_wr_timezone import TimezoneComponentCache, get_timezone_component, to_standard, to_standard_ical
+
+
+BERLIN = [zoneinfo.ZoneInfo("Europe/Berlin"), pytz.timezone("Europe/Berlin"), dateutil.tz.gettz("Europe/Berlin")]
+
+
+def test_equivalent_time_zones_share_the_component():
+    cache = TimezoneComponentCache()
+    components = [cache.get(timezone) for timezone in BERLIN]
+    assert components[0] is components[1] is components[2]
+    assert len(cache.components) == 1
+
+
+def test_bytes_are_those_of_the_component():
+    cache = TimezoneComponentCache()
+    component = cache.get(BERLIN[0])
+    assert cache.get_ical(BERLIN[1]) == component.to_ical()
+    assert cache.ical_of(component) == component.to_ical()
+    assert cache.ical_of(icalendar.Timezone.from_tzinfo(BERLIN[0])) is None
+
+
+def test_least_recently_used_components_are_removed():
+    cache = TimezoneComponentCache(max_size=2)
+    berlin = cache.get(BERLIN[0])
+    cache.get(zoneinfo.ZoneInfo("Europe/Paris"))
+    cache.get(BERLIN[0])
+    cache.get(zoneinfo.ZoneInfo("Europe/London"))
+    assert cache.get(BERLIN[0]) is berlin
+    assert [key[0] for key in cache.components] == ["Europe/London", "Europe/Berlin"]
+
+
+def test_time_zones_without_tzid_use_their_repr():
+    cache = TimezoneComponentCache()
+    timezone = dateutil.tz.tzoffset(None, 3600)
+    assert cache.key(timezone) == ((dateutil.tz.tzoffset, repr(timezone)), None, None)
+    assert cache.key(dateutil.tz.tzoffset(None, 3600)) == cache.key(timezone)
+
+
+def test_time_zones_with_the_same_name_and_other_offsets_are_not_shared():
+    cache = TimezoneComponentCache()
+    eet = cache.get(datetime.timezone(datetime.timedelta(hours=2), "EET"))
+    other = cache.get(datetime.timezone(datetime.timedelta(hours=3), "EET"))
+    assert eet is not other
+    assert b"TZOFFSETTO:+0300" in other.to_ical()
+
+
+@pytest.mark.parametrize("timezone", BERLIN)
+def test_named_time_zones_use_their_name(timezone):
+    assert TimezoneComponentCache().key(timezone) == ("Europe/Berlin", None, None)
+
+
+def test_components_are_shared_through_the_directory(tmp_path, monkeypatch):
+    ical = TimezoneComponentCache(directory=str(tmp_path)).get_ical(BERLIN[0], 2020, 2021)
+    assert len(os.listdir(tmp_path)) == 1
+    monkeypatch.setattr(icalendar.Timezone, "from_tzinfo", None)
+    cache = TimezoneComponentCache(directory=str(tmp_path))
+    assert cache.get_ical(BERLIN[1], 2020, 2021) == ical
+    assert cache.get(BERLIN[1], 2020, 2021).to_ical() == ical
+
+
+def test_missing_directory_is_ignored(tmp_path):
+    cache = TimezoneComponentCache(directory=str(tmp_path / "cache"))
+    os.rmdir(tmp_path / "cache")
+    assert cache.get(BERLIN[0]).tz_name == "Europe/Berlin"
+
+
+def test_warm(monkeypatch):
+    cache = TimezoneComponentCache()
+    cache.warm(["Europe/Berlin", pytz.timezone("Asia/Tokyo")])
+    monkeypatch.setattr(icalendar.Timezone, "from_tzinfo", None)
+    assert cache.get(BERLIN[2]).tz_name == "Europe/Berlin"
+    assert cache.get(zoneinfo.ZoneInfo("Asia/Tokyo")).tz_name == "Asia/Tokyo"
+
+
+def test_threads_get_the_same_component():
+    cache = TimezoneComponentCache()
+    components = []
+    threads = [
+        threading.Thread(target=lambda timezone=timezone: components.append(cache.get(timezone)))
+        for timezone in BERLIN * 4
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(components) == 12
+    assert all(component is components[0] for component in components)
+
+
+def test_get_timezone_component_uses_the_cache():
+    assert get_timezone_component(BERLIN[1]) is x_wr_timezone.timezone_components.get(BERLIN[0])
+
+
+@pytest.mark.parametrize("trim", [True, False])
+def test_bytes_are_inserted_like_the_component(calendar_pair, trim):
+    data = calendar_pair.input.as_bytes()
+    if not x_wr_timezone.has_x_wr_timezone(data):
+        pytest.skip("The calendar is copied without parsing it.")
+    expected = to_standard(
+        calendar_pair.input.as_icalendar(), add_timezone_component=True, trim_timezone_component=trim)
+    assert to_standard_ical(data, add_timezone_component=True, trim_timezone_component=trim) == expected.to_ical()
+
+
+def test_bytes_are_inserted_into_empty_calendars():
+    data = b"BEGIN:VCALENDAR\r\nX-WR-TIMEZONE:Europe/Berlin\r\nEND:VCALENDAR\r\n"
+    expected = to_standard(icalendar.Calendar.from_ical(data), add_timezone_component=True)
+    assert to_standard_ical(data, add_timezone_component=True) == expected.to_ical()
+
+
+def test_cmd_stores_components_in_the_cache_dir(cli_runner, calendars, tmp_path, monkeypatch):
+    monkeypatch.setattr(x_wr_timezone, "timezone_components", TimezoneComponentCache())
+    path = calendars["single-events-DTSTART-DTEND.in.ics"].path
+    result = cli_runner.invoke(x_wr_timezone.main, ["--cache-dir", str(tmp_path), path])
+    assert result.exit_code == 0, result.output
+    assert len(os.listdir(tmp_path / "vtimezone")) == 1
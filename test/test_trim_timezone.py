@@ -0,0 +1,117 @@
+"""The VTIMEZONE component can be trimmed to the years the events use."""
+import datetime
+from zoneinfo import ZoneInfo
+
+import pytest
+from icalendar import Calendar, Event
+
+from x_wr_timezone import UTCChangingWalker, get_timezone_component, to_standard
+
+NEW_YORK = ZoneInfo("America/New_York")
+
+
+def transitions(timezone_component):
+    """Return the start dates of the observances."""
+    return sorted(
+        observance.DTSTART.date()
+        for observance in timezone_component.standard + timezone_component.daylight
+    )
+
+
+def test_trimmed_component_only_has_the_years(calendars):
+    calendar = calendars["single-events-DTSTART-DTEND.in.ics"].as_icalendar()
+    new_calendar = to_standard(calendar, add_timezone_component=True, trim_timezone_component=True)
+    timezone, = new_calendar.timezones
+    assert timezone.tz_name == "America/New_York"
+    dates = transitions(timezone)
+    assert dates[0] == datetime.date(2021, 1, 1)
+    assert dates[-1] < datetime.date(2023, 1, 1)
+    assert len(timezone.to_ical()) < len(get_timezone_component(NEW_YORK).to_ical())
+
+
+def test_events_are_the_same_as_without_trimming(calendar_pair):
+    trimmed = to_standard(
+        calendar_pair.input.as_icalendar(), add_timezone_component=True, trim_timezone_component=True)
+    untrimmed = to_standard(calendar_pair.input.as_icalendar(), add_timezone_component=True)
+    assert [event.to_ical() for event in trimmed.events] == [event.to_ical() for event in untrimmed.events]
+
+
+def test_trimming_needs_the_timezone_component(calendars):
+    calendar = calendars["single-events-DTSTART-DTEND.in.ics"].as_icalendar()
+    assert to_standard(calendar, trim_timezone_component=True).timezones == []
+
+
+def test_trimmed_components_are_cached():
+    assert get_timezone_component(NEW_YORK, 2020, 2021) is get_timezone_component(NEW_YORK, 2020, 2021)
+    assert get_timezone_component(NEW_YORK, 2020, 2021) is not get_timezone_component(NEW_YORK)
+
+
+def event(dtstart, rrule=None):
+    """Return an event starting at dtstart."""
+    event = Event()
+    event.add("DTSTART", dtstart)
+    if rrule is not None:
+        event.add("RRULE", rrule)
+    return event
+
+
+@pytest.mark.parametrize(
+    "events,years",
+    [
+        ([], (None, None)),
+        ([event(datetime.date(2020, 1, 1))], (None, None)),
+        ([event(datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc))], (2019, 2019)),
+        ([event(datetime.datetime(2020, 6, 1)), event(datetime.datetime(2023, 1, 1))], (2020, 2023)),
+        ([event(datetime.datetime(2020, 6, 1), {"FREQ": "DAILY"})], (2020, None)),
+        ([event(datetime.datetime(2020, 6, 1), {"FREQ": "DAILY", "COUNT": 3})], (2020, None)),
+        ([event(datetime.datetime(2020, 6, 1), {"FREQ": "DAILY", "UNTIL": datetime.date(2025, 1, 1)})], (2020, 2025)),
+    ]
+)
+def test_used_years(events, years):
+    calendar = Calendar()
+    for e in events:
+        calendar.add_component(e)
+    walker = UTCChangingWalker(NEW_YORK, track_range=True)
+    walker.walk(calendar)
+    assert walker.used_years() == years
+
+
+def test_years_are_not_tracked_by_default():
+    calendar = Calendar()
+    calendar.add_component(event(datetime.datetime(2020, 6, 1)))
+    walker = UTCChangingWalker(NEW_YORK)
+    walker.walk(calendar)
+    assert walker.used_years() == (None, None)
+
+
+def transition_lines(timezone_component):
+    """Return the lines with the dates of the transitions."""
+    return b"".join(
+        line for line in timezone_component.to_ical().replace(b"\r\n ", b"").splitlines(keepends=True)
+        if line.startswith((b"DTSTART", b"RDATE"))
+    )
+
+
+def test_open_end_goes_to_the_default_last_date():
+    lines = transition_lines(get_timezone_component(NEW_YORK, 2030, None))
+    assert b"DTSTART:20300101T000000" in lines
+    assert b"2037" in lines
+    assert b"2038" not in lines
+
+
+def test_open_end_after_the_default_last_date():
+    lines = transition_lines(get_timezone_component(NEW_YORK, 2040, None))
+    assert b"DTSTART:20400101T000000" in lines
+    assert b"2041" not in lines
+
+
+def test_cmd_trim_timezone(cal_cmd):
+    cal = cal_cmd(["--trim-timezone", "single-events-DTSTART-DTEND.in.ics"])
+    timezone, = cal.timezones
+    assert transitions(timezone)[0] == datetime.date(2021, 1, 1)
+
+
+def test_cmd_trim_timezone_with_stream(cli_runner):
+    result = cli_runner.invoke(__import__("x_wr_timezone").main, ["--trim-timezone", "--stream"])
+    assert result.exit_code != 0
+    assert "--trim-timezone" in result.output
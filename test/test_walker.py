@@ -0,0 +1,186 @@
+"""Test the walkers and the conversion of values."""
+import datetime
+import zoneinfo
+
+import dateutil.tz
+import icalendar
+import pytest
+import pytz
+from icalendar.prop import vDDDLists
+
+from x_wr_timezone import CalendarWalker, TimezoneConverter, UTCChangingWalker, to_standard
+
+
+class CountingWalker(CalendarWalker):
+    """Count the datetimes."""
+
+    def __init__(self):
+        self.datetimes = 0
+
+    def walk_value_datetime(self, dt):
+        self.datetimes += 1
+        return dt
+
+
+def test_subclass_has_its_own_dispatch_table():
+    walker = CountingWalker()
+    walker.walk_value([datetime.datetime(2020, 1, 1), datetime.date(2020, 1, 1)])
+    assert walker.datetimes == 1
+    assert CountingWalker.value_walkers[datetime.datetime] is CountingWalker.walk_value_datetime
+    assert CountingWalker.value_walkers[datetime.date] is CalendarWalker.walk_value_default
+    assert CalendarWalker.value_walkers.get(datetime.datetime) in (None, CalendarWalker.walk_value_datetime)
+
+
+def test_unknown_values_stay_the_same():
+    value = object()
+    assert UTCChangingWalker(zoneinfo.ZoneInfo("UTC")).walk_value(value) is value
+
+
+BERLIN = [
+    zoneinfo.ZoneInfo("Europe/Berlin"),
+    pytz.timezone("Europe/Berlin"),
+    dateutil.tz.gettz("Europe/Berlin"),
+]
+
+
+@pytest.mark.parametrize("timezone", BERLIN)
+@pytest.mark.parametrize("dt", [
+    datetime.datetime(2024, 7, 1, 10, tzinfo=datetime.timezone.utc),
+    datetime.datetime(2024, 7, 1, 10, tzinfo=zoneinfo.ZoneInfo("UTC")),
+    pytz.utc.localize(datetime.datetime(2024, 7, 1, 10)),
+])
+def test_utc_is_converted(timezone, dt):
+    new_dt = TimezoneConverter(timezone).convert(dt)
+    assert new_dt == dt
+    assert new_dt.replace(tzinfo=None) == datetime.datetime(2024, 7, 1, 12)
+
+
+@pytest.mark.parametrize("timezone", BERLIN)
+def test_floating_is_localized(timezone):
+    new_dt = TimezoneConverter(timezone).convert(datetime.datetime(2024, 1, 1, 10))
+    assert new_dt.utcoffset() == datetime.timedelta(hours=1)
+    assert new_dt.replace(tzinfo=None) == datetime.datetime(2024, 1, 1, 10)
+
+
+@pytest.mark.parametrize("timezone", BERLIN)
+def test_other_time_zones_stay_the_same(timezone):
+    dt = datetime.datetime(2024, 1, 1, 10, tzinfo=zoneinfo.ZoneInfo("America/New_York"))
+    assert TimezoneConverter(timezone).convert(dt) is dt
+
+
+def test_pytz_uses_localize():
+    timezone = pytz.timezone("Europe/Berlin")
+    assert TimezoneConverter(timezone).localize == timezone.localize
+
+
+def test_cache_is_off_by_default():
+    walker = UTCChangingWalker(zoneinfo.ZoneInfo("Europe/Berlin"))
+    assert walker.cache_info() is None
+
+
+def test_cache_returns_the_same_object():
+    walker = UTCChangingWalker(zoneinfo.ZoneInfo("Europe/Berlin"), cache_size=10)
+    dt1 = walker.walk_value(datetime.datetime(2024, 1, 1, 10, tzinfo=datetime.timezone.utc))
+    dt2 = walker.walk_value(datetime.datetime(2024, 1, 1, 10, tzinfo=datetime.timezone.utc))
+    assert dt1 is dt2
+    info = walker.cache_info()
+    assert (info.hits, info.misses, info.maxsize, info.currsize) == (1, 1, 10, 1)
+
+
+def test_cache_distinguishes_equal_datetimes_of_other_time_zones():
+    """2024-01-01 10:00 UTC and 11:00 in Berlin are equal but only UTC is converted."""
+    walker = UTCChangingWalker(zoneinfo.ZoneInfo("Asia/Tokyo"), cache_size=10)
+    utc = datetime.datetime(2024, 1, 1, 10, tzinfo=datetime.timezone.utc)
+    berlin = datetime.datetime(2024, 1, 1, 11, tzinfo=zoneinfo.ZoneInfo("Europe/Berlin"))
+    assert utc == berlin
+    assert walker.walk_value(utc).tzinfo == zoneinfo.ZoneInfo("Asia/Tokyo")
+    assert walker.walk_value(berlin) is berlin
+    assert walker.cache_info().hits == 0
+
+
+def test_cache_is_bounded():
+    walker = UTCChangingWalker(zoneinfo.ZoneInfo("Europe/Berlin"), cache_size=2)
+    for hour in range(5):
+        walker.walk_value(datetime.datetime(2024, 1, 1, hour))
+    assert walker.cache_info().currsize == 2
+
+
+def test_to_standard_with_cache(calendar_pair):
+    output = to_standard(calendar_pair.input.as_icalendar(), cache_size=100)
+    assert output == calendar_pair.output.as_icalendar()
+
+
+def scalar_walk(walker, l):
+    """The result of walking a list one value at a time."""
+    return vDDDLists([walker.walk_value(ddd.dt) for ddd in l.dts])
+
+
+UTC = datetime.timezone.utc
+NEW_YORK = zoneinfo.ZoneInfo("America/New_York")
+
+
+@pytest.mark.parametrize("timezone", BERLIN + [zoneinfo.ZoneInfo("UTC"), pytz.utc])
+@pytest.mark.parametrize("dts", [
+    [datetime.datetime(2024, 1, 1, tzinfo=UTC) + datetime.timedelta(days=50 * i) for i in range(30)],
+    [datetime.datetime(2024, 1, 1) + datetime.timedelta(days=50 * i) for i in range(30)],
+    [datetime.datetime(2024, 1, 1, tzinfo=NEW_YORK), datetime.datetime(2024, 7, 1, tzinfo=UTC), datetime.datetime(2024, 7, 1)],
+    [datetime.datetime(2024, 7, 1), datetime.datetime(2024, 1, 1, tzinfo=NEW_YORK)],
+    [datetime.datetime(2024, 1, 1, tzinfo=UTC), pytz.utc.localize(datetime.datetime(2024, 7, 1))],
+])
+def test_list_is_converted_like_its_values(timezone, dts):
+    walker = UTCChangingWalker(timezone)
+    l = vDDDLists(dts)
+    new_l = walker.walk_value(l)
+    expected = scalar_walk(walker, l)
+    assert new_l == expected
+    # icalendar 6 only sets the parameters of lists with a TZID.
+    assert getattr(new_l, "params", {}) == getattr(expected, "params", {})
+    assert new_l.to_ical() == expected.to_ical()
+    assert [ddd.params for ddd in new_l.dts] == [ddd.params for ddd in expected.dts]
+
+
+def test_changed_values_do_not_share_their_parameters():
+    l = vDDDLists([datetime.datetime(2024, 1, 1, tzinfo=UTC), datetime.datetime(2024, 7, 1, tzinfo=UTC)])
+    new_l = UTCChangingWalker(zoneinfo.ZoneInfo("Europe/Berlin")).walk_value(l)
+    new_l.dts[0].params["X-TEST"] = "1"
+    assert "X-TEST" not in new_l.dts[1].params
+
+
+def test_unchanged_list_is_the_same():
+    l = vDDDLists([datetime.datetime(2024, 1, 1, tzinfo=NEW_YORK), datetime.date(2024, 1, 1)])
+    assert UTCChangingWalker(zoneinfo.ZoneInfo("Europe/Berlin")).walk_value(l) is l
+
+
+class NoLookups(icalendar.cal.Alarm):
+    """An alarm that fails if its properties are looked up."""
+
+    def get(self, *args):
+        raise AssertionError("The properties should not be looked up.")
+
+    __getitem__ = get
+
+
+def test_components_without_date_properties_are_not_looked_at():
+    alarm = NoLookups()
+    event = icalendar.Event()
+    event.add("DTSTART", datetime.datetime(2020, 1, 1))
+    event.add_component(alarm)
+    new_event = UTCChangingWalker(zoneinfo.ZoneInfo("Europe/Berlin")).walk_component(event)
+    assert new_event.subcomponents[0] is alarm
+    assert new_event.DTSTART.tzinfo == zoneinfo.ZoneInfo("Europe/Berlin")
+
+
+def test_timezone_components_are_skipped():
+    timezone = icalendar.Timezone.from_tzinfo(zoneinfo.ZoneInfo("Europe/Berlin"))
+    assert UTCChangingWalker(zoneinfo.ZoneInfo("Europe/Paris")).walk_component(timezone) is timezone
+
+
+@pytest.mark.parametrize("name,attribute", [("VTODO", "DUE"), ("VJOURNAL", "DTSTART"), ("VEVENT", "DTEND")])
+def test_component_types_are_converted(name, attribute):
+    component = icalendar.cal.Component.from_ical(
+        "BEGIN:{0}\r\n{1}:20200101T120000Z\r\nEND:{0}\r\n".format(name, attribute))
+    calendar = icalendar.Calendar()
+    calendar.add_component(component)
+    new_calendar = UTCChangingWalker(zoneinfo.ZoneInfo("Europe/Berlin")).walk(calendar)
+    assert new_calendar.subcomponents[0][attribute].dt == datetime.datetime(
+        2020, 1, 1, 13, tzinfo=zoneinfo.ZoneInfo("Europe/Berlin"))
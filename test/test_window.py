@@ -0,0 +1,130 @@
+"""Test that only the events in a time window are kept."""
+import datetime
+import zoneinfo
+
+import pytest
+from icalendar import Calendar, Event
+
+from x_wr_timezone import ConversionStats, TimeWindow, main, to_standard, to_standard_ical
+
+BERLIN = zoneinfo.ZoneInfo("Europe/Berlin")
+START = datetime.date(2024, 3, 1)
+END = datetime.date(2024, 4, 1)
+
+
+def event(uid, dtstart, dtend=None, **properties):
+    """Create an event."""
+    event = Event()
+    event.add("UID", uid)
+    event.add("DTSTART", dtstart)
+    if dtend is not None:
+        event.add("DTEND", dtend)
+    for name, value in properties.items():
+        event.add(name.replace("_", "-"), value)
+    return event
+
+
+def dt(*args, tzinfo=None):
+    """Create a datetime."""
+    return datetime.datetime(*args, tzinfo=tzinfo)
+
+
+@pytest.mark.parametrize("event,kept", [
+    (event("inside", dt(2024, 3, 10, 10), dt(2024, 3, 10, 11)), True),
+    (event("before", dt(2024, 2, 10, 10), dt(2024, 2, 10, 11)), False),
+    (event("after", dt(2024, 4, 10, 10), dt(2024, 4, 10, 11)), False),
+    (event("starts at the end", dt(2024, 4, 1)), False),
+    (event("ends in the window", dt(2024, 2, 28, 10), dt(2024, 3, 1, 11)), True),
+    (event("spans the window", dt(2024, 1, 1), dt(2024, 5, 1)), True),
+    (event("duration into the window", dt(2024, 2, 29, 10), duration=datetime.timedelta(days=2)), True),
+    (event("all day before", datetime.date(2024, 2, 29)), False),
+    (event("all day at the start", datetime.date(2024, 3, 1)), True),
+    (event("floating in Berlin", dt(2024, 4, 1, 0, 30)), False),
+    (event("UTC before Berlin midnight", dt(2024, 3, 31, 21, 30, tzinfo=datetime.timezone.utc)), True),
+    (event("UTC after Berlin midnight", dt(2024, 3, 31, 22, 30, tzinfo=datetime.timezone.utc)), False),
+    (event("forever", dt(2020, 1, 1), rrule={"FREQ": "YEARLY"}), True),
+    (event("forever after", dt(2025, 1, 1), rrule={"FREQ": "YEARLY"}), False),
+    (event("until before", dt(2020, 1, 1), rrule={"FREQ": "MONTHLY", "UNTIL": dt(2024, 2, 1)}), False),
+    (event("until inside", dt(2020, 1, 1), rrule={"FREQ": "MONTHLY", "UNTIL": dt(2024, 3, 2)}), True),
+    (event("until date", dt(2020, 1, 1, 12), rrule={"FREQ": "DAILY", "UNTIL": datetime.date(2024, 2, 29)}), False),
+    (event("count before", dt(2024, 1, 1), rrule={"FREQ": "WEEKLY", "COUNT": 5}), False),
+    (event("count inside", dt(2024, 1, 1), rrule={"FREQ": "WEEKLY", "COUNT": 10}), True),
+    (event("zoned count", dt(2024, 1, 1, 10, tzinfo=zoneinfo.ZoneInfo("America/New_York")), rrule={"FREQ": "WEEKLY", "COUNT": 10}), True),
+    (event("zoned count before", dt(2024, 1, 1, 10, tzinfo=zoneinfo.ZoneInfo("America/New_York")), rrule={"FREQ": "WEEKLY", "COUNT": 9}), False),
+    (event("rdate inside", dt(2023, 1, 1), rdate=[dt(2023, 6, 1), dt(2024, 3, 5)]), True),
+    (event("rdate before", dt(2023, 1, 1), rdate=[dt(2023, 6, 1), dt(2024, 2, 5)]), False),
+    (event("moved into the window", dt(2024, 3, 5), recurrence_id=dt(2024, 2, 5)), True),
+    (event("moved out of the window", dt(2024, 5, 5), recurrence_id=dt(2024, 3, 5)), True),
+    (event("moved outside", dt(2024, 5, 5), recurrence_id=dt(2024, 5, 1)), False),
+])
+def test_events_in_the_window(event, kept):
+    window = TimeWindow(START, END, BERLIN)
+    assert window.contains(event) == kept
+
+
+@pytest.mark.parametrize("start,end,kept", [
+    (None, None, True),
+    (None, START, False),
+    (END, None, False),
+    (START, None, True),
+    (None, END, True),
+])
+def test_open_windows(start, end, kept):
+    window = TimeWindow(start, end, BERLIN)
+    assert window.contains(event("inside", dt(2024, 3, 10, 10), dt(2024, 3, 10, 11))) == kept
+
+
+def test_events_without_dtstart_are_kept():
+    assert TimeWindow(START, END).contains(Event())
+
+
+def calendar():
+    """A calendar with events before, in and after the window."""
+    calendar = Calendar()
+    calendar.add("X-WR-TIMEZONE", "Europe/Berlin")
+    calendar.add_component(event("before", dt(2024, 2, 10, 10)))
+    calendar.add_component(event("inside", dt(2024, 3, 10, 10)))
+    calendar.add_component(event("after", dt(2024, 4, 10, 10)))
+    return calendar
+
+
+def uids(calendar):
+    """Return the UIDs of the events."""
+    return [str(event["UID"]) for event in calendar.walk("VEVENT")]
+
+
+@pytest.mark.parametrize("inplace", [True, False])
+def test_to_standard_removes_events(inplace):
+    original = calendar()
+    stats = ConversionStats()
+    result = to_standard(original, window_start=START, window_end=END, inplace=inplace, stats=stats)
+    assert uids(result) == ["inside"]
+    assert result.events[0].DTSTART.tzinfo is BERLIN
+    assert stats.counters["events_removed"] == 2
+    if not inplace:
+        assert uids(original) == ["before", "inside", "after"]
+
+
+def test_other_components_are_kept():
+    original = calendar()
+    original.add_component(Calendar.from_ical("BEGIN:VTODO\r\nDTSTART:20200101T000000\r\nEND:VTODO\r\n"))
+    result = to_standard(original, window_start=START, window_end=END, add_timezone_component=True)
+    assert [component.name for component in result.subcomponents] == ["VTIMEZONE", "VEVENT", "VTODO"]
+
+
+def test_calendars_without_x_wr_timezone_are_filtered():
+    original = calendar()
+    del original["X-WR-TIMEZONE"]
+    result = Calendar.from_ical(to_standard_ical(original.to_ical(), window_start=START, window_end=END))
+    assert uids(result) == ["inside"]
+
+
+def test_cmd_from_until(cal_cmd):
+    cal = cal_cmd(["--from", "2021-12-22T11:00", "--until", "2021-12-22 20:00", "single-events-DTSTART-DTEND.in.ics"])
+    assert uids(cal) == ["3bc4jff97631or97ntnk75n4se@google.com"]
+
+
+def test_cmd_from_until_with_stream(cli_runner):
+    result = cli_runner.invoke(main, ["--from", "2021-03-29", "--stream"])
+    assert result.exit_code != 0
+    assert "--from" in result.output
@@ -0,0 +1,122 @@
+"""Test the worker that converts many calendars from stdin to stdout."""
+import datetime
+import io
+import json
+import subprocess
+
+import pytest
+
+from conftest import EXECUTABLE
+from x_wr_timezone import main, run_worker, to_standard_ical
+
+NAME = "single-events-DTSTART-DTEND.in.ics"
+
+
+def request(data:bytes, **options) -> bytes:
+    """Return the framed request."""
+    options["length"] = len(data)
+    return json.dumps(options).encode() + b"\n" + data
+
+
+def read_responses(out_file) -> list:
+    """Return the (header, data) responses."""
+    responses = []
+    while True:
+        line = out_file.readline()
+        if not line:
+            return responses
+        header = json.loads(line)
+        responses.append((header, out_file.read(header["length"])))
+
+
+def work(data:bytes, **defaults) -> list:
+    """Run the worker with the input data and return the responses."""
+    out_file = io.BytesIO()
+    run_worker(io.BytesIO(data), out_file, **defaults)
+    out_file.seek(0)
+    return read_responses(out_file)
+
+
+def test_several_calendars(calendars):
+    inputs = [calendars[name].as_bytes() for name in sorted(calendars) if name.endswith(".in.ics")]
+    responses = work(b"".join(request(data) for data in inputs))
+    assert [data for _, data in responses] == [
+        to_standard_ical(data, add_timezone_component=True) for data in inputs]
+    assert all(header["error"] is None for header, _ in responses)
+
+
+@pytest.mark.parametrize("options,expected", [
+    ({}, {"add_timezone_component": True}),
+    ({"add_timezone": False}, {}),
+    ({"timezone": "Europe/Berlin"}, {"add_timezone_component": True, "timezone": "Europe/Berlin"}),
+    ({"trim_timezone": True}, {"add_timezone_component": True, "trim_timezone_component": True}),
+    ({"from": "2021-12-22T19:00:00", "until": "2022-01-01"}, {
+        "add_timezone_component": True,
+        "window_start": datetime.datetime(2021, 12, 22, 19),
+        "window_end": datetime.date(2022, 1, 1)}),
+])
+def test_options(calendars, options, expected):
+    data = calendars[NAME].as_bytes()
+    (header, result), = work(request(data, **options))
+    assert header["error"] is None
+    assert result == to_standard_ical(data, **expected)
+
+
+def test_defaults(calendars):
+    data = calendars[NAME].as_bytes()
+    (_, result), = work(request(data), add_timezone_component=False, timezone="UTC")
+    assert result == to_standard_ical(data, timezone="UTC")
+
+
+def test_a_failing_conversion_does_not_stop_the_worker(calendars):
+    data = calendars[NAME].as_bytes()
+    responses = work(request(data, timezone="Nowhere/Unknown") + request(data))
+    assert responses[0] == ({"length": 0, "error": responses[0][0]["error"]}, b"")
+    assert "Nowhere/Unknown" in responses[0][0]["error"]
+    assert responses[1][0]["error"] is None
+
+
+@pytest.mark.parametrize("key", ["add_timezone", "trim_timezone", "reuse_bytes"])
+@pytest.mark.parametrize("value", ["false", 0, 1, None])
+def test_options_must_be_booleans(calendars, key, value):
+    data = calendars[NAME].as_bytes()
+    responses = work(request(data, **{key: value}) + request(data))
+    assert responses[0] == ({"length": 0, "error": responses[0][0]["error"]}, b"")
+    assert key in responses[0][0]["error"]
+    assert responses[1][0]["error"] is None
+
+
+@pytest.mark.parametrize("data", [b"not json\n", b"{}\n", b"[1]\n", b'{"length": -1}\n', b'{"length": 100000}\nBEGIN'])
+def test_bad_requests_stop_the_worker(calendars, data):
+    valid = request(calendars[NAME].as_bytes())
+    (header, result), = work(data + valid)
+    assert header["error"]
+    assert result == b""
+
+
+def test_empty_lines_are_skipped(calendars):
+    data = calendars[NAME].as_bytes()
+    assert len(work(b"\n" + request(data) + b"\r\n" + request(data))) == 2
+
+
+def test_worker_options_are_exclusive(cli_runner):
+    result = cli_runner.invoke(main, ["--worker", "--stream"])
+    assert result.exit_code != 0
+    assert "--worker" in result.output
+
+
+def test_worker_process_answers_each_request(calendars):
+    """The worker answers a request before the next one is sent."""
+    data = calendars[NAME].as_bytes()
+    process = subprocess.Popen([EXECUTABLE, "--worker"], stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+    try:
+        for options in ({}, {"add_timezone": False}):
+            process.stdin.write(request(data, **options))
+            process.stdin.flush()
+            header = json.loads(process.stdout.readline())
+            assert header["error"] is None
+            assert process.stdout.read(header["length"]) == to_standard_ical(
+                data, add_timezone_component=options.get("add_timezone", True))
+    finally:
+        process.stdin.close()
+        assert process.wait(10) == 0
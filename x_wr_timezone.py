@@ -11,15 +11,56 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """Bring calendars using X-WR-TIMEZONE into RFC 5545 form."""
+from __future__ import annotations
+import collections
+import concurrent.futures
+import contextlib
+import datetime
 import functools
-from io import BytesIO
+import hashlib
+import importlib
+import io
+import itertools
+import json
+import os
+import re
+import shutil
 import sys
-import zoneinfo
-from icalendar.prop import vDDDTypes, vDDDLists
-import datetime
-import icalendar
+import tempfile
+import threading
+import time
+import tracemalloc
 from typing import Optional
-import click
+
+
+class LazyModule:
+    """A module that is imported when one of its attributes is used first.
+
+    This keeps the import of this module and the command line fast.
+    The module is imported with importlib.import_module() which waits
+    for other threads importing it.
+    Nothing is put into sys.modules until the module is really imported.
+    After the import, the global variable of the same name refers to the
+    module itself.
+    """
+
+    def __init__(self, name:str):
+        """Import the module called name when it is used."""
+        self.name = name
+
+    def __getattr__(self, attribute:str):
+        """Import the module and return its attribute."""
+        module = importlib.import_module(self.name)
+        if globals().get(self.name) is self:
+            globals()[self.name] = module
+        return getattr(module, attribute)
+
+    def __repr__(self):
+        return "<{} {!r}>".format(self.__class__.__name__, self.name)
+
+
+icalendar = LazyModule("icalendar")
+zoneinfo = LazyModule("zoneinfo")
 
 X_WR_TIMEZONE = "X-WR-TIMEZONE"
 
@@ -29,6 +70,71 @@ def list_is(l1, l2):
     return len(l1) == len(l2) and all(e1 is e2 for e1, e2 in zip(l1, l2))
 
 
+class ConversionStats:
+    """Counters and stage timings of conversions.
+
+    Pass it to to_standard() and the other conversion functions
+    to see where the time goes.
+    The counters are:
+
+        components_visited: components that the walker looked at
+        components_skipped: components without properties to walk
+        components_copied: components copied because they changed
+        components_changed: components changed in place
+        values.<type>: values walked by their type name
+        datetimes_converted: datetimes that were changed
+        datetimes_unchanged: datetimes that stayed the same
+        timezone_cache_hits, timezone_cache_loads, timezone_cache_misses:
+            VTIMEZONE components found in the memory, the directory or created
+        calendars_not_parsed: calendars copied because they need no conversion
+        components_reused: components taken from an earlier conversion
+        events_removed: events outside of the time window
+
+    The stages record the seconds they took.
+    If tracemalloc is tracing, they also record the peak of the memory
+    that was allocated in addition to the memory traced at their start.
+
+    A ConversionStats object should not be used by several threads at a time.
+    """
+
+    def __init__(self):
+        """Create empty statistics."""
+        self.counters = collections.Counter()
+        self.stages = {}  # name: {"seconds": float, "peak_memory": int}
+
+    def count(self, name:str, number:int=1):
+        """Increase a counter."""
+        self.counters[name] += number
+
+    @contextlib.contextmanager
+    def stage(self, name:str):
+        """Measure the time and peak memory of the code in the with block.
+
+        If a stage is measured several times, the times add up.
+        """
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+            start_memory = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            stage = self.stages.setdefault(name, {"seconds": 0.0})
+            stage["seconds"] += time.perf_counter() - start
+            if tracing:
+                peak_memory = tracemalloc.get_traced_memory()[1] - start_memory
+                stage["peak_memory"] = max(stage.get("peak_memory", 0), peak_memory)
+
+    def as_dict(self) -> dict:
+        """Return the statistics as a dict that can be saved as JSON."""
+        return {"counters": dict(sorted(self.counters.items())), "stages": self.stages}
+
+    def to_json(self) -> str:
+        """Return the statistics as JSON."""
+        return json.dumps(self.as_dict(), indent=2)
+
+
 class CalendarWalker:
     """I walk along the components and values of an icalendar object.
 
@@ -37,6 +143,42 @@ class CalendarWalker:
 
     VALUE_ATTRIBUTES = ['DTSTART', 'DTEND', 'RDATE', 'RECURRENCE-ID', 'EXDATE']
 
+    # The properties to walk by component name.
+    # Components which are not listed and have no subcomponents are
+    # returned without looking at their properties.
+    # Properties that RFC 5545 requires in UTC are not listed.
+    COMPONENT_VALUE_ATTRIBUTES = {
+        "VEVENT": VALUE_ATTRIBUTES,
+        "VTODO": ['DTSTART', 'DUE', 'RDATE', 'RECURRENCE-ID', 'EXDATE'],
+        "VJOURNAL": ['DTSTART', 'RDATE', 'RECURRENCE-ID', 'EXDATE'],
+    }
+
+    # Components which are returned as they are.
+    SKIPPED_COMPONENTS = {"VTIMEZONE"}
+
+    # Whether to change the components instead of copying them.
+    inplace = False
+
+    # The ConversionStats to count in or None.
+    stats = None
+
+    def __init_subclass__(cls, **kw):
+        """Compile the value walkers of the subclass."""
+        super().__init_subclass__(**kw)
+        cls.compile_value_walkers()
+
+    @classmethod
+    def compile_value_walkers(cls):
+        """Create the table which maps the value types to walk_value_* methods.
+
+        Types are added to the table when their first value is walked.
+        """
+        cls.value_walkers_by_name = {
+            name[len("walk_value_"):]: getattr(cls, name)
+            for name in dir(cls) if name.startswith("walk_value_")
+        }
+        cls.value_walkers = {}
+
     def copy_if_changed(self, component, attributes, subcomponents):
         """Check if an icalendar Component has changed and copy it if it has.
 
@@ -51,7 +193,18 @@ class CalendarWalker:
         return component
 
     def copy_component(self, component, attributes, subcomponents):
-        """Create a copy of the component with attributes and subcomponents."""
+        """Create a copy of the component with attributes and subcomponents.
+
+        If the walker is inplace, the component is changed instead.
+        """
+        if self.stats is not None:
+            self.stats.count("components_changed" if self.inplace else "components_copied")
+        if self.inplace:
+            for key, value in attributes.items():
+                component[key] = value
+            component.subcomponents[:] = subcomponents
+            forget_source(component)
+            return component
         component = component.copy()
         for key, value in attributes.items():
             component[key] = value
@@ -62,21 +215,35 @@ class CalendarWalker:
 
     def walk(self, calendar):
         """Walk along the calendar and return the changed or identical object."""
-        subcomponents = []
-        for subcomponent in calendar.subcomponents:
-            if isinstance(subcomponent, icalendar.cal.Event):
-                subcomponent = self.walk_event(subcomponent)
-            subcomponents.append(subcomponent)
-        return self.copy_if_changed(calendar, {}, subcomponents)
+        return self.walk_component(calendar)
+
+    def walk_component(self, component):
+        """Walk along the component and its subcomponents.
+
+        Return the changed or identical object.
+        """
+        names = self.COMPONENT_VALUE_ATTRIBUTES.get(component.name)
+        subcomponents = component.subcomponents
+        if self.stats is not None:
+            self.stats.count("components_visited")
+        if names is None and not subcomponents or component.name in self.SKIPPED_COMPONENTS:
+            if self.stats is not None:
+                self.stats.count("components_skipped")
+            return component
+        attributes = {}
+        if names is not None:
+            for name in names:
+                value = component.get(name)
+                if value is not None:
+                    attributes[name] = self.walk_value(value)
+        if subcomponents:
+            walk = self.walk_component
+            subcomponents = [walk(subcomponent) for subcomponent in subcomponents]
+        return self.copy_if_changed(component, attributes, subcomponents)
 
     def walk_event(self, event):
         """Walk along the event and return the changed or identical object."""
-        attributes = {}
-        for name in self.VALUE_ATTRIBUTES:
-            value = event.get(name)
-            if value is not None:
-                attributes[name] = self.walk_value(value)
-        return self.copy_if_changed(event, attributes, event.subcomponents)
+        return self.walk_component(event)
 
     def walk_value_default(self, value):
         """Default method for walking along a value type."""
@@ -84,9 +251,11 @@ class CalendarWalker:
 
     def walk_value(self, value):
         """Walk along a value type."""
-        name = "walk_value_" + type(value).__name__
-        walk = getattr(self, name, self.walk_value_default)
-        return walk(value)
+        walk = self.value_walkers.get(type(value))
+        if walk is None:
+            walk = self.value_walkers[type(value)] = self.value_walkers_by_name.get(
+                type(value).__name__, self.value_walkers_by_name["default"])
+        return walk(self, value)
 
     def walk_value_list(self, l):
         """Walk through a list of values."""
@@ -95,19 +264,59 @@ class CalendarWalker:
             return l
         return v
 
+    def walk_values(self, values):
+        """Walk along values and return a list of the results."""
+        walk = self.walk_value
+        return [walk(value) for value in values]
+
     def walk_value_vDDDLists(self, l):
+        """Walk along a list of dates and datetimes like RDATE and EXDATE.
+
+        The result is the same as vDDDLists(new_dts) but long lists
+        are converted in one pass:
+        Values that do not change keep their vDDDTypes.
+        Changed values of the same type and time zone get a copy of the
+        parameters of the first one instead of computing them again.
+        """
         dts = [ddd.dt for ddd in l.dts]
-        new_dts = [self.walk_value(dt) for dt in dts]
+        new_dts = self.walk_values(dts)
         if list_is(new_dts, dts):
             return l
-        return vDDDLists(new_dts)
+        copiers = {}  # (type, id(tzinfo)): parameters_copier()
+        values = []
+        append = values.append
+        new_value = icalendar.prop.vDDDTypes.__new__
+        kind_type = kind_tzinfo = copy_parameters = None
+        for ddd, dt in zip(l.dts, new_dts):
+            if dt is ddd.dt:
+                append(ddd)
+                continue
+            tzinfo = getattr(dt, "tzinfo", None)
+            if dt.__class__ is not kind_type or tzinfo is not kind_tzinfo:
+                kind_type, kind_tzinfo = dt.__class__, tzinfo
+                copy_parameters = copiers.get((kind_type, id(tzinfo)))
+            if copy_parameters is None:
+                value = icalendar.prop.vDDDTypes(dt)
+                copy_parameters = copiers[(kind_type, id(tzinfo))] = parameters_copier(value.params)
+            else:
+                value = new_value(icalendar.prop.vDDDTypes)
+                value.dt = dt
+                value.params = copy_parameters()
+            append(value)
+        result = icalendar.prop.vDDDLists([])
+        result.dts = values
+        for value in reversed(values):
+            if "TZID" in value.params:
+                result.params = icalendar.Parameters({"TZID": value.params["TZID"]})
+                break
+        return result
 
     def walk_value_vDDDTypes(self, value):
         """Walk along an icalendar value type"""
         dt = self.walk_value(value.dt)
         if dt is value.dt:
             return value
-        return vDDDTypes(dt)
+        return icalendar.prop.vDDDTypes(dt)
 
     def walk_value_datetime(self, dt):
         """Walk along a datetime.datetime object."""
@@ -122,6 +331,29 @@ class CalendarWalker:
     def is_Floating(self, dt):
         return dt.tzname() is None
 
+CalendarWalker.compile_value_walkers()
+
+
+def parameters_copier(params:icalendar.Parameters):
+    """Return a function that returns copies of the parameters.
+
+    Each copy can be changed on its own.
+    The keys are already upper case, so they are not normalized again
+    like in Parameters(params). This is several times faster.
+    """
+    parameters_type = type(params)
+    mro = parameters_type.__mro__
+    base = mro[mro.index(icalendar.caselessdict.CaselessDict) + 1]
+    items = tuple(base.items(params))
+    new = parameters_type.__new__
+    set_item = base.__setitem__
+    def copy_parameters():
+        result = new(parameters_type)
+        for key, value in items:
+            set_item(result, key, value)
+        return result
+    return copy_parameters
+
 
 def is_pytz(tzinfo):
     """Whether the time zone requires localize() and normalize().
@@ -132,40 +364,595 @@ def is_pytz(tzinfo):
     return hasattr(tzinfo , "localize")
 
 
-@functools.cache
-def get_timezone_component(timezone:datetime.tzinfo) -> icalendar.Timezone:
+def timezone_name(tzinfo) -> Optional[str]:
+    """Return the name of the time zone in the tz database or None.
+
+    Only zoneinfo, pytz and dateutil time zones read from the tz database
+    have a name that identifies their rules.
+    """
+    name = getattr(tzinfo, "key", None) or getattr(tzinfo, "zone", None)
+    if isinstance(name, str):
+        return name
+    filename = getattr(tzinfo, "_filename", None)  # dateutil.tz.tzfile
+    if isinstance(filename, str):
+        _, separator, name = filename.rpartition("zoneinfo" + os.sep)
+        if separator or not os.path.isabs(filename):
+            return name
+    return None
+
+
+# The last date of the transitions in VTIMEZONE components by default.
+DEFAULT_LAST_DATE = datetime.date(2038, 1, 1)
+
+
+class TimezoneComponentCache:
+    """A bounded cache of VTIMEZONE components and their bytes.
+
+    The components are stored by the name of the time zone so that the
+    pytz, zoneinfo and dateutil time zones of the same name share them.
+    If more than max_size components are cached, the least recently
+    used ones are removed.
+
+    If a directory is given, the bytes of the components are stored in it.
+    Other processes using the same directory parse them instead of
+    computing the transitions again.
+
+    The cache can be used from several threads.
+    Finding a cached component does not wait for a lock.
+    Only adding and removing components takes the lock.
+    """
+
+    def __init__(self, max_size:int=128, directory:Optional[str]=None):
+        """Create an empty cache."""
+        self.max_size = max_size
+        self.components = collections.OrderedDict()  # key: (component, ical)
+        self.icals = {}  # id(component): (component, ical)
+        self.lock = threading.Lock()
+        self.use_directory(directory)
+
+    def use_directory(self, directory:Optional[str]):
+        """Store the bytes of the components in the directory from now on."""
+        self.directory = directory
+        self.files = None if directory is None else ConversionCache(directory)
+
+    def key(self, timezone:datetime.tzinfo, first_year:Optional[int]=None, last_year:Optional[int]=None) -> tuple:
+        """Return the key of the component for the time zone and the years.
+
+        Time zones without a name use their repr() if it describes them.
+        Otherwise, the time zone itself is the key.
+        """
+        name = timezone_name(timezone)
+        if name is None:
+            name = (type(timezone), repr(timezone)) if type(timezone).__repr__ is not object.__repr__ else timezone
+        return name, first_year, last_year
+
+    def get(self, timezone:datetime.tzinfo, first_year:Optional[int]=None, last_year:Optional[int]=None, stats:Optional[ConversionStats]=None) -> icalendar.Timezone:
+        """Return the VTIMEZONE component, see get_timezone_component()."""
+        return self.get_entry(timezone, first_year, last_year, stats)[0]
+
+    def get_ical(self, timezone:datetime.tzinfo, first_year:Optional[int]=None, last_year:Optional[int]=None, stats:Optional[ConversionStats]=None) -> bytes:
+        """Return the bytes of the VTIMEZONE component."""
+        return self.get_entry(timezone, first_year, last_year, stats)[1]
+
+    def get_entry(self, timezone:datetime.tzinfo, first_year:Optional[int], last_year:Optional[int], stats:Optional[ConversionStats]=None) -> tuple:
+        """Return the component and its bytes and cache them.
+
+        If stats are given, the hits and misses are counted.
+        """
+        key = self.key(timezone, first_year, last_year)
+        entry = self.components.get(key)
+        if entry is not None:
+            try:
+                self.components.move_to_end(key)
+            except KeyError:
+                pass  # Another thread removed it.
+            if stats is not None:
+                stats.count("timezone_cache_hits")
+            return entry
+        entry = self.load(key)
+        if entry is not None and stats is not None:
+            stats.count("timezone_cache_loads")
+        if entry is None:
+            if stats is not None:
+                stats.count("timezone_cache_misses")
+            component = self.create(timezone, first_year, last_year)
+            entry = component, component.to_ical()
+            self.save(key, entry[1])
+        with self.lock:
+            entry = self.components.setdefault(key, entry)
+            self.icals[id(entry[0])] = entry
+            while len(self.components) > self.max_size:
+                _, (component, _) = self.components.popitem(last=False)
+                del self.icals[id(component)]
+        return entry
+
+    def create(self, timezone:datetime.tzinfo, first_year:Optional[int], last_year:Optional[int]) -> icalendar.Timezone:
+        """Compute the VTIMEZONE component from the time zone."""
+        if first_year is None:
+            return icalendar.Timezone.from_tzinfo(timezone)
+        first_date = datetime.date(first_year, 1, 1)
+        # icalendar 6.1 only has the private _DEFAULT_LAST_DATE.
+        last_date = getattr(icalendar.Timezone, "DEFAULT_LAST_DATE", DEFAULT_LAST_DATE)
+        if last_year is not None or last_date <= first_date:
+            last_date = datetime.date(max(first_year, last_year or first_year) + 1, 1, 1)
+        return icalendar.Timezone.from_tzinfo(timezone, first_date=first_date, last_date=last_date)
+
+    def file_key(self, key:tuple) -> Optional[str]:
+        """Return the key of the file in the directory or None."""
+        tzid, first_year, last_year = key
+        if self.files is None or not isinstance(tzid, str):
+            return None
+        return self.files.key(
+            tzid.encode(), first_year=first_year, last_year=last_year, icalendar=icalendar.__version__)
+
+    def load(self, key:tuple) -> Optional[tuple]:
+        """Return the component and its bytes from the directory or None."""
+        file_key = self.file_key(key)
+        if file_key is None:
+            return None
+        file = self.files.open(file_key)
+        if file is None:
+            return None
+        with file:
+            ical = file.read()
+        return icalendar.Timezone.from_ical(ical), ical
+
+    def save(self, key:tuple, ical:bytes):
+        """Store the bytes of the component in the directory if possible."""
+        file_key = self.file_key(key)
+        if file_key is not None:
+            try:
+                self.files.store(file_key, ical)
+            except OSError:
+                pass
+
+    def ical_of(self, component:icalendar.Timezone) -> Optional[bytes]:
+        """Return the cached bytes of the component or None if it is not cached."""
+        entry = self.icals.get(id(component))
+        if entry is None or entry[0] is not component:
+            return None
+        return entry[1]
+
+    def warm(self, timezones):
+        """Compute the components of the time zones in advance.
+
+        timezones can be names like "Europe/Berlin" or tzinfo objects.
+        """
+        for timezone in timezones:
+            if not isinstance(timezone, datetime.tzinfo):
+                timezone = zoneinfo.ZoneInfo(str(timezone))
+            self.get(timezone)
+
+    def clear(self):
+        """Remove all components from the memory."""
+        with self.lock:
+            self.components.clear()
+            self.icals.clear()
+
+
+def get_timezone_component(timezone:datetime.tzinfo, first_year:Optional[int]=None, last_year:Optional[int]=None, stats:Optional[ConversionStats]=None) -> icalendar.Timezone:
     """Return a timezone component for the tzid and cache it.
-    
-    The result is cached.
+
+    If first_year is given, the component only contains the transitions
+    from the start of first_year to the end of last_year.
+    If last_year is None, the transitions go up to the default last date
+    of icalendar.
+
+    The result is cached in timezone_components.
+    If stats are given, the cache hits and misses are counted.
     """
-    return icalendar.Timezone.from_tzinfo(timezone)
+    return timezone_components.get(timezone, first_year, last_year, stats)
 
 
-class UTCChangingWalker(CalendarWalker):
-    """Changes the UTC time zone into a new time zone."""
+class TimezoneConverter:
+    """Change UTC and floating datetimes into a time zone.
+
+    How to attach the time zone is decided once:
+    pytz requires localize(), zoneinfo and dateutil use replace().
+    """
 
     def __init__(self, timezone):
-        """Initialize the walker with the new time zone."""
+        """Initialize the converter with the new time zone."""
+        self.timezone = timezone
+        if is_pytz(timezone):
+            self.localize = timezone.localize
+        else:
+            self.localize = self.replace_tzinfo
+
+    def replace_tzinfo(self, dt):
+        """Set the time zone of a floating datetime."""
+        return dt.replace(tzinfo=self.timezone)
+
+    def convert(self, dt):
+        """Return the datetime in the new time zone if it is UTC or floating."""
+        tzname = dt.tzname()
+        if tzname is None:
+            return self.localize(dt)
+        if tzname.upper() == "UTC":
+            return dt.astimezone(self.timezone)
+        return dt
+
+
+class UTCChangingWalker(CalendarWalker):
+    """Changes the UTC time zone into a new time zone.
+
+    A walker should be used by one thread at a time.
+    """
+
+    def __init__(self, timezone, cache_size:Optional[int]=None, inplace:bool=False, track_range:bool=False, stats:Optional[ConversionStats]=None):
+        """Initialize the walker with the new time zone.
+
+        cache_size is the number of converted datetimes to remember.
+        Equal datetimes are then converted to the same object.
+        By default, nothing is cached.
+
+        inplace changes the walked components instead of copying them.
+
+        track_range remembers the first and the last datetime that
+        the walk touched, see used_years().
+
+        stats is a ConversionStats object to count the walked components
+        and values in. Counting the values is slower than walking them.
+        """
         self.new_timezone = timezone
+        self.inplace = inplace
+        self.track_range = track_range
+        self.first_datetime = self.last_datetime = None
+        # Whether an event repeats without an end.
+        self.recurs_forever = False
+        self.convert_datetime = TimezoneConverter(timezone).convert
+        self.cache_info = lambda: None
+        if cache_size is not None:
+            convert = self.convert_datetime
+            # Aware datetimes of different time zones can be equal.
+            # The time zone and the fold distinguish them.
+            @functools.lru_cache(maxsize=cache_size)
+            def convert_cached(dt, tzinfo_id, fold):
+                return convert(dt)
+            self.convert_datetime = lambda dt: convert_cached(dt, id(dt.tzinfo), dt.fold)
+            self.cache_info = convert_cached.cache_info
+        if track_range:
+            convert_untracked = self.convert_datetime
+            def convert_and_track(dt):
+                dt = convert_untracked(dt)
+                self.track_datetime(dt)
+                return dt
+            self.convert_datetime = convert_and_track
+        self.stats = stats
+        if stats is not None:
+            self.count_values(stats)
+
+    def count_values(self, stats:ConversionStats):
+        """Count the walked values and converted datetimes in stats."""
+        walk_value = self.walk_value
+        def walk_value_and_count(value):
+            stats.count("values." + type(value).__name__)
+            return walk_value(value)
+        self.walk_value = walk_value_and_count
+        # Without the shortcut for datetimes, all values are counted.
+        self.walk_values = functools.partial(CalendarWalker.walk_values, self)
+        convert = self.convert_datetime
+        def convert_and_count(dt):
+            new_dt = convert(dt)
+            stats.count("datetimes_unchanged" if new_dt is dt else "datetimes_converted")
+            return new_dt
+        self.convert_datetime = convert_and_count
+
+    def track_datetime(self, dt):
+        """Extend the range of used datetimes to include the aware datetime."""
+        if self.first_datetime is None:
+            self.first_datetime = self.last_datetime = dt
+        elif dt < self.first_datetime:
+            self.first_datetime = dt
+        elif dt > self.last_datetime:
+            self.last_datetime = dt
+
+    def track_rrule(self, rrule):
+        """Extend the range of used datetimes to the end of the recurrence."""
+        untils = rrule.get("UNTIL", [])
+        for until in (untils if isinstance(untils, list) else [untils]):
+            if not isinstance(until, datetime.datetime):
+                until = datetime.datetime.combine(until, datetime.time())
+            self.convert_datetime(until)
+        if "UNTIL" not in rrule:
+            self.recurs_forever = True
+
+    def used_years(self) -> tuple:
+        """Return the first and the last year that the walk touched.
+
+        The years are those in the new time zone.
+        The last year is None if an event repeats without an end.
+        If no datetime was touched, this returns (None, None).
+        """
+        if self.first_datetime is None:
+            return None, None
+        first_year = self.first_datetime.astimezone(self.new_timezone).year
+        if self.recurs_forever:
+            return first_year, None
+        return first_year, self.last_datetime.astimezone(self.new_timezone).year
+
+    def walk_component(self, component):
+        """Walk along the component and track the end of its recurrences."""
+        if self.track_range and component.name in self.COMPONENT_VALUE_ATTRIBUTES:
+            rrules = component.get("RRULE")
+            if rrules is not None:
+                for rrule in (rrules if isinstance(rrules, list) else [rrules]):
+                    self.track_rrule(rrule)
+        return super().walk_component(component)
 
     def walk_value_datetime(self, dt):
         """Walk along a datetime.datetime object."""
-        if self.is_UTC(dt):
-            return dt.astimezone(self.new_timezone)
-        elif self.is_Floating(dt):
-            if is_pytz(self.new_timezone):
-                return self.new_timezone.localize(dt)
-            return dt.replace(tzinfo=self.new_timezone)
-        return dt
+        return self.convert_datetime(dt)
+
+    def walk_values(self, values):
+        """Walk along values and convert the datetimes directly."""
+        convert = self.convert_datetime
+        walk = self.walk_value
+        return [
+            convert(value) if value.__class__ is datetime.datetime else walk(value)
+            for value in values
+        ]
+
+    def walk_raw_component(self, data:bytes) -> bytes:
+        """Walk along a component in its bytes form and return the bytes."""
+        component = icalendar.Component.from_ical(data)
+        new_component = self.walk_component(component)
+        if new_component is component:
+            return data
+        return new_component.to_ical()
+
+
+class TimeWindow:
+    """The time between start and end in which events are kept.
+
+    start and end are dates or datetimes. None leaves that side open.
+    Floating datetimes, dates and UTC are taken to be in the timezone.
+    """
+
+    def __init__(self, start=None, end=None, timezone:Optional[datetime.tzinfo]=None):
+        """Create a window from start to end."""
+        self.to_aware = TimezoneConverter(timezone or datetime.timezone.utc).convert
+        self.start = None if start is None else self.to_datetime(start)
+        self.end = None if end is None else self.to_datetime(end)
+
+    def to_datetime(self, dt) -> datetime.datetime:
+        """Return the date or datetime as an aware datetime to compare."""
+        if not isinstance(dt, datetime.datetime):
+            dt = datetime.datetime(dt.year, dt.month, dt.day)
+        return self.to_aware(dt)
+
+    def overlaps(self, start:datetime.datetime, end:Optional[datetime.datetime]) -> bool:
+        """Whether the time from start to end is in the window.
+
+        end None means that there is no end.
+        Events without duration are in the window if they start in it.
+        """
+        return (self.end is None or start < self.end) and (
+            self.start is None or end is None or end > self.start or start == end >= self.start)
+
+    def contains(self, event) -> bool:
+        """Whether an occurrence of the event can be in the window.
+
+        Events without DTSTART and events that cannot be understood are kept.
+        A modified occurrence is kept if it or the occurrence that it
+        replaces is in the window.
+        """
+        try:
+            span = self.span(event)
+            if span is None:
+                return True
+            if self.overlaps(*span):
+                return True
+            recurrence_id = event.get("RECURRENCE-ID")
+            if recurrence_id is not None:
+                recurrence_id = self.to_datetime(recurrence_id.dt)
+                return self.overlaps(recurrence_id, recurrence_id)
+            return False
+        except (ValueError, TypeError, AttributeError):
+            return True
+
+    def span(self, event) -> Optional[tuple]:
+        """Return the start of the first and the end of the last occurrence.
+
+        The end is None if the event repeats forever.
+        None is returned for events without DTSTART.
+        """
+        dtstart = event.get("DTSTART")
+        if dtstart is None:
+            return None
+        start = self.to_datetime(dtstart.dt)
+        if "DTEND" in event:
+            duration = self.to_datetime(event["DTEND"].dt) - start
+        elif "DURATION" in event:
+            duration = event["DURATION"].dt
+        elif isinstance(dtstart.dt, datetime.datetime):
+            duration = datetime.timedelta()
+        else:
+            duration = datetime.timedelta(days=1)
+        last = start
+        rrules = event.get("RRULE", [])
+        if not isinstance(rrules, list):
+            rrules = [rrules]
+        for rrule in rrules:
+            last_start = self.last_start(rrule, dtstart.dt)
+            if last_start is None:
+                return start, None
+            last = max(last, last_start)
+        rdates = event.get("RDATE", [])
+        if not isinstance(rdates, list):
+            rdates = [rdates]
+        for rdate in rdates:
+            for value in rdate.dts:
+                if isinstance(value.dt, tuple):
+                    # A period has a start and an end or a duration.
+                    period_start, period_end = value.dt
+                    period_start = self.to_datetime(period_start)
+                    if isinstance(period_end, datetime.timedelta):
+                        period_end = period_start + period_end
+                    last = max(last, self.to_datetime(period_end) - duration)
+                else:
+                    last = max(last, self.to_datetime(value.dt))
+        return start, last + duration
+
+    def last_start(self, rrule, dtstart) -> Optional[datetime.datetime]:
+        """Return the start of the last occurrence of the RRULE or None if it repeats forever."""
+        until = rrule.get("UNTIL")
+        if until:
+            if isinstance(until, list):
+                until = until[0]
+            if isinstance(until, datetime.datetime):
+                return self.to_datetime(until)
+            # The occurrences can start during the whole day.
+            return self.to_datetime(until) + datetime.timedelta(days=1)
+        if not rrule.get("COUNT"):
+            return None
+        tzinfo = None
+        if isinstance(dtstart, datetime.datetime):
+            # dateutil needs floating datetimes if UNTIL is not given.
+            tzinfo = dtstart.tzinfo
+            dtstart = dtstart.replace(tzinfo=None)
+        else:
+            dtstart = datetime.datetime(dtstart.year, dtstart.month, dtstart.day)
+        last = None
+        from dateutil.rrule import rrulestr
+        for last in rrulestr(rrule.to_ical().decode(), dtstart=dtstart):
+            pass
+        if last is None:
+            return None
+        if tzinfo is not None:
+            # The occurrences are in the time zone of DTSTART.
+            last = TimezoneConverter(tzinfo).convert(last)
+        return self.to_datetime(last)
+
+    def filter(self, components) -> list:
+        """Return the components without the events outside of the window."""
+        return [
+            component for component in components
+            if component.name != "VEVENT" or self.contains(component)
+        ]
+
+
+class LazyComponents(list):
+    """A list of components which are walked when they are accessed.
+
+    The first access to a component walks it with the walker and the
+    result replaces the component in the list.
+    Iterating walks the components one by one.
+    Methods which need all of the components walk all of them first.
+
+    Several threads can read the list. Components are walked only once.
+    """
+
+    def __init__(self, components, walker:CalendarWalker):
+        """Create a list of components that the walker has not walked yet."""
+        super().__init__(components)
+        self.walker = walker
+        # The components are kept so that their ids are not reused.
+        self.pending = {id(component): component for component in components}
+        self.lock = threading.Lock()
+
+    def walk_item(self, index:int):
+        """Return the walked component at the index."""
+        component = list.__getitem__(self, index)
+        if id(component) not in self.pending:
+            return component
+        with self.lock:
+            # Another thread may have walked it in the meantime.
+            component = list.__getitem__(self, index)
+            if self.pending.pop(id(component), None) is None:
+                return component
+            new_component = self.walker.walk_component(component)
+            list.__setitem__(self, index, new_component)
+            return new_component
+
+    def walk_all(self):
+        """Walk all the components that are not walked yet."""
+        if self.pending:
+            for index in range(len(self)):
+                self.walk_item(index)
+
+    def __getitem__(self, index):
+        """Return the walked component or list of components."""
+        if isinstance(index, slice):
+            return [self.walk_item(i) for i in range(*index.indices(len(self)))]
+        return self.walk_item(index)
+
+    def __iter__(self):
+        """Walk the components while iterating over them."""
+        index = 0
+        while index < len(self):
+            yield self.walk_item(index)
+            index += 1
+
+    def __reversed__(self):
+        """Walk the components while iterating over them backwards."""
+        for index in range(len(self) - 1, -1, -1):
+            yield self.walk_item(index)
+
+    def __contains__(self, component):
+        self.walk_all()
+        return super().__contains__(component)
+
+    def __eq__(self, other):
+        self.walk_all()
+        return super().__eq__(other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        self.walk_all()
+        return super().__repr__()
+
+    def __add__(self, other):
+        self.walk_all()
+        return super().__add__(other)
+
+    def __reduce_ex__(self, protocol):
+        """Pickle and copy as a list of walked components."""
+        return list, (list(self),)
+
+    def copy(self):
+        return list(self)
+
+    def index(self, *args):
+        self.walk_all()
+        return super().index(*args)
+
+    def count(self, component):
+        self.walk_all()
+        return super().count(component)
+
+    def pop(self, index=-1):
+        component = self.walk_item(index)
+        super().pop(index)
+        return component
+
+    def remove(self, component):
+        self.walk_all()
+        super().remove(component)
+
+    def sort(self, **kw):
+        self.walk_all()
+        super().sort(**kw)
 
 
 def to_standard(
         calendar : icalendar.Calendar,
         timezone:Optional[datetime.tzinfo]=None,
-        add_timezone_component:bool=False
+        add_timezone_component:bool=False,
+        cache_size:Optional[int]=None,
+        inplace:bool=False,
+        trim_timezone_component:bool=False,
+        stats:Optional[ConversionStats]=None,
+        lazy:bool=False,
+        window_start=None,
+        window_end=None
     ) -> icalendar.Calendar:
     """Make a calendar that might use X-WR-TIMEZONE compatible with RFC 5545.
 
+    This can be called from several threads at the same time.
+
     Arguments:
     
         calendar: is an icalendar.Calendar object. It does not need to have
@@ -178,62 +965,1541 @@ def to_standard(
             pytz.timezone or any other timezone accepted by the datetime module.
         
         add_timezone_component: whether to add a VTIMEZONE component to the result.
+
+        cache_size: the number of converted datetimes to remember while
+            walking the calendar, see UTCChangingWalker.
+
+        inplace: whether to change the calendar and its components instead
+            of copying them. This is destructive: the calendar argument is
+            modified and returned. This saves time and memory if the original
+            calendar is not used afterwards.
+
+        trim_timezone_component: whether the added VTIMEZONE component only
+            contains the transitions of the years that the events use.
+            This makes the result smaller.
+
+        stats: a ConversionStats object to record the counters and the
+            walk and timezone_component stages in.
+
+        lazy: whether to walk the components of the calendar when they are
+            accessed instead of now, see LazyComponents.
+            This is faster if only some of the components are used.
+            The walk stage is not measured.
+            This cannot be used with trim_timezone_component because
+            that needs all the events.
+
+        window_start, window_end: dates or datetimes to keep only the events
+            that have occurrences between them, see TimeWindow.
+            None leaves that side of the window open.
+            The events are removed before the calendar is walked.
+            Floating datetimes are in the time zone of the calendar.
     """
+    if lazy and trim_timezone_component and add_timezone_component:
+        raise ValueError("lazy and trim_timezone_component cannot be used together.")
     if timezone is None:
         timezone = calendar.get(X_WR_TIMEZONE, None)
     if timezone is not None and not isinstance(timezone, datetime.tzinfo):
         timezone = zoneinfo.ZoneInfo(str(timezone))
     result : icalendar.Calendar = calendar
     del calendar
-    if timezone is not None:
-        walker = UTCChangingWalker(timezone)
-        result = walker.walk(result)
-        if add_timezone_component:
+    if window_start is not None or window_end is not None:
+        subcomponents = TimeWindow(window_start, window_end, timezone).filter(result.subcomponents)
+        if stats is not None:
+            stats.count("events_removed", len(result.subcomponents) - len(subcomponents))
+        if inplace:
+            result.subcomponents[:] = subcomponents
+        else:
             new_cal = result.copy()
-            new_cal.subcomponents = result.subcomponents[:]
+            new_cal.subcomponents = subcomponents
             result = new_cal
-            result.subcomponents.insert(0, get_timezone_component(timezone))
+    if timezone is not None:
+        track_range = add_timezone_component and trim_timezone_component
+        walker = UTCChangingWalker(
+            timezone, cache_size=cache_size, inplace=inplace, track_range=track_range, stats=stats)
+        if lazy:
+            subcomponents = result.subcomponents
+            if not inplace:
+                result = result.copy()
+            result.subcomponents = LazyComponents(subcomponents, walker)
+        else:
+            with measure(stats, "walk"):
+                result = walker.walk(result)
+        if add_timezone_component:
+            if not inplace and not lazy:
+                new_cal = result.copy()
+                new_cal.subcomponents = result.subcomponents[:]
+                result = new_cal
+            years = walker.used_years() if track_range else (None, None)
+            with measure(stats, "timezone_component"):
+                result.subcomponents.insert(0, get_timezone_component(timezone, *years, stats))
     return result
 
-@click.command()
-@click.argument('in_file', type=click.File('rb'), default="-")
-@click.argument('out_file', type=click.File('wb'), default="-")
-@click.version_option()
-@click.help_option()
-@click.option('--add-timezone/--no-timezone', default=True, help="Add a VTIMEZONE component to the result.")
-def main(in_file:BytesIO, out_file:BytesIO, add_timezone: bool):
-    """x-wr-timezone converts ICSfiles with X-WR-TIMEZONE to use RFC 5545 instead.
 
-    Convert input:
+def measure(stats:Optional[ConversionStats], stage:str):
+    """Return a context manager to measure the stage if there are stats."""
+    if stats is None:
+        return contextlib.nullcontext()
+    return stats.stage(stage)
+
+
+CONTENT_LINE_NAME = re.compile(rb"[^;:]*")
+FOLDING = re.compile(rb"\r?\n[ \t]")
+CALENDAR_START = re.compile(rb"(?:\xef\xbb\xbf)?\s*BEGIN:VCALENDAR\s", re.I)
+FIRST_COMPONENT = re.compile(rb"^BEGIN:(?!VCALENDAR\s)", re.M | re.I)
+X_WR_TIMEZONE_LINE = re.compile(rb"^X-WR-TIMEZONE[;:]", re.M | re.I)
+UID_LINE = re.compile(rb"^UID[;:]([^\r\n]*)", re.M | re.I)
+CALENDAR_END = re.compile(rb"^END:VCALENDAR", re.M | re.I)
+EVENT_END = re.compile(rb"^END:VEVENT[ \t]*(?:\r?\n|$)", re.M | re.I)
+TIMEZONE_COMPONENT = re.compile(rb"^BEGIN:VTIMEZONE\s.*?^END:VTIMEZONE[ \t]*(?:\r?\n|$)", re.M | re.I | re.S)
+
+# Calendars of at least this many bytes are converted in parallel by the command line.
+PARALLEL_MIN_SIZE = 2_000_000
+
+
+def has_x_wr_timezone(data:bytes) -> bool:
+    """Whether the bytes of a calendar might contain X-WR-TIMEZONE.
+
+    The calendar properties before the first component are searched
+    case insensitive and with unfolded lines.
+    Any other occurrence of "X-WR-TIMEZONE" counts as well.
+    """
+    if X_WR_TIMEZONE.encode() in data:
+        return True
+    first_component = FIRST_COMPONENT.search(data)
+    header = data if first_component is None else data[:first_component.start()]
+    return X_WR_TIMEZONE_LINE.search(FOLDING.sub(b"", header)) is not None
+
+
+def iter_content_lines(file):
+    """Yield the content lines of a binary file.
+
+    Folded lines are yielded together with their continuation lines
+    so that the bytes are exactly those of the file.
+    """
+    parts = []
+    for line in file:
+        if parts and line[:1] in (b" ", b"\t"):
+            parts.append(line)
+            continue
+        if parts:
+            yield b"".join(parts)
+        parts = [line]
+    if parts:
+        yield b"".join(parts)
+
+
+def parse_content_line(line:bytes) -> tuple:
+    """Return the upper case name and the value of a raw content line."""
+    line = FOLDING.sub(b"", line).rstrip(b"\r\n")
+    name = CONTENT_LINE_NAME.match(line).group().strip().upper().decode("UTF-8", "replace")
+    value = line.split(b":", 1)[1] if b":" in line else b""
+    return name, value.decode("UTF-8", "replace").strip()
+
+
+def to_standard_stream(
+        in_file,
+        timezone:Optional[datetime.tzinfo]=None,
+        add_timezone_component:bool=False,
+        stats:Optional[ConversionStats]=None,
+        converted_components:Optional[dict]=None
+    ):
+    """Convert a calendar file component by component and yield the bytes.
+
+    This works like to_standard() but only one component is in memory at
+    a time.
+    The X-WR-TIMEZONE property is taken from the calendar properties
+    which come before the first component.
+    Components which do not change are yielded as they are in the file.
+
+    Arguments:
+
+        in_file: a binary file with the calendar.
+
+        timezone, add_timezone_component: see to_standard()
+
+        stats: a ConversionStats object to count in.
+            The stages are not measured because they alternate.
+
+        converted_components: a dict that maps the bytes of components to
+            the bytes of their conversion. These components are not
+            converted again, see to_standard_incremental().
+    """
+    lines = iter_content_lines(in_file)
+    header, x_wr_timezone, line = read_header(lines)
+    yield header
+    if timezone is None:
+        timezone = x_wr_timezone
+    if timezone is not None and not isinstance(timezone, datetime.tzinfo):
+        timezone = zoneinfo.ZoneInfo(str(timezone))
+    if timezone is None:
+        if line is not None:
+            yield line
+        yield from lines
+        return
+    if add_timezone_component:
+        yield timezone_components.get_ical(timezone, stats=stats)
+    walker = UTCChangingWalker(timezone, stats=stats)
+    for is_component, data in iter_components(line, lines):
+        if not is_component:
+            yield data
+            continue
+        converted = None if converted_components is None else converted_components.get(data)
+        if converted is None:
+            yield walker.walk_raw_component(data)
+        else:
+            if stats is not None:
+                stats.count("components_reused")
+            yield converted
+
+
+class CalendarLineReader:
+    """Sort the content lines of a calendar into the header and the components.
+
+    The lines are given one by one so that to_standard_stream() and
+    to_standard_stream_async() share the state.
+    First, read_header_line() takes the calendar properties before the
+    first component. Then, read_line() takes the rest.
+    """
+
+    def __init__(self):
+        """Start before the first line."""
+        self.header = []
+        self.x_wr_timezone = None
+        self.component = []
+        self.depth = 0
+
+    def read_header_line(self, line:bytes) -> bool:
+        """Add the line to the header and return True if it belongs to it.
+
+        The value of the first X-WR-TIMEZONE property is kept in x_wr_timezone.
+        """
+        name, value = parse_content_line(line)
+        if name in ("BEGIN", "END") and value.upper() != "VCALENDAR":
+            return False
+        self.header.append(line)
+        if name == X_WR_TIMEZONE and self.x_wr_timezone is None:
+            self.x_wr_timezone = value
+        return True
+
+    def read_line(self, line:bytes) -> Optional[tuple]:
+        """Take a line after the header and return (is_component, data) or None.
+
+        The top-level components are returned as a whole with is_component
+        True once their last line is read. Until then, None is returned.
+        The lines between them are returned with is_component False.
+        """
+        name, _ = parse_content_line(line)
+        if name == "BEGIN":
+            self.depth += 1
+        if not self.depth:
+            return False, line
+        self.component.append(line)
+        if name == "END":
+            self.depth -= 1
+            if not self.depth:
+                component = b"".join(self.component)
+                self.component = []
+                return True, component
+        return None
+
+
+def read_header(lines) -> tuple:
+    """Read the content lines of the calendar properties before the first component.
+
+    Returns (header, x_wr_timezone, line):
+    header is the bytes of the lines,
+    x_wr_timezone is the value of the first X-WR-TIMEZONE property or None and
+    line is the first line after the header or None.
+    """
+    reader = CalendarLineReader()
+    line = None
+    for line in lines:
+        if not reader.read_header_line(line):
+            break
+        line = None
+    return b"".join(reader.header), reader.x_wr_timezone, line
+
+
+def iter_components(line:Optional[bytes], lines):
+    """Yield (is_component, data) for the content lines after the header.
+
+    line is the first line and lines yields the others.
+    The top-level components are yielded as a whole with is_component True.
+    The lines between them are yielded one by one with is_component False.
+    """
+    reader = CalendarLineReader()
+    while line is not None:
+        result = reader.read_line(line)
+        if result is not None:
+            yield result
+        line = next(lines, None)
+
+
+def to_standard_ical(
+        data:bytes,
+        timezone:Optional[datetime.tzinfo]=None,
+        add_timezone_component:bool=False,
+        trim_timezone_component:bool=False,
+        stats:Optional[ConversionStats]=None,
+        window_start=None,
+        window_end=None,
+        reuse_bytes:bool=False
+    ) -> bytes:
+    """Convert the bytes of a calendar and return the bytes of the result.
+
+    See to_standard() for the arguments.
+    The stats also measure the parse and serialize stages.
+    If the calendar does not use X-WR-TIMEZONE and no timezone or window
+    is given, data is returned without parsing it.
+
+    reuse_bytes writes the components that the conversion does not change
+    as they are in data instead of serializing them again,
+    see from_ical_keeping_sources().
+    """
+    windowed = window_start is not None or window_end is not None
+    if timezone is None and not windowed and CALENDAR_START.match(data) and not has_x_wr_timezone(data):
+        if stats is not None:
+            stats.count("calendars_not_parsed")
+        return data
+    with measure(stats, "parse"):
+        calendar = from_ical_keeping_sources(data) if reuse_bytes else icalendar.Calendar.from_ical(data)
+    to_ical = to_ical_keeping_sources if reuse_bytes else icalendar.Calendar.to_ical
+    new_cal = to_standard(
+        calendar, timezone=timezone, add_timezone_component=add_timezone_component,
+        inplace=True, trim_timezone_component=trim_timezone_component, stats=stats,
+        window_start=window_start, window_end=window_end)
+    with measure(stats, "serialize"):
+        if add_timezone_component and new_cal.subcomponents:
+            # The cached VTIMEZONE component is already serialized.
+            timezone_ical = timezone_components.ical_of(new_cal.subcomponents[0])
+            if timezone_ical is not None:
+                del new_cal.subcomponents[0]
+                return insert_component(to_ical(new_cal), timezone_ical)
+        return to_ical(new_cal)
+
+
+def insert_component(calendar_ical:bytes, component_ical:bytes) -> bytes:
+    """Insert the bytes of a component as the first component of a calendar."""
+    first_component = FIRST_COMPONENT.search(calendar_ical)
+    if first_component is None:
+        index = calendar_ical.upper().rindex(b"END:VCALENDAR")
+    else:
+        index = first_component.start()
+    return calendar_ical[:index] + component_ical + calendar_ical[index:]
+
+
+def iter_standard_ical(
+        calendar:icalendar.Calendar,
+        timezone:Optional[datetime.tzinfo]=None,
+        add_timezone_component:bool=False,
+        cache_size:Optional[int]=None,
+        stats:Optional[ConversionStats]=None
+    ):
+    """Convert a calendar and yield the bytes of the result piece by piece.
+
+    The calendar properties, each converted component and the end of
+    the calendar are yielded one after the other.
+    Only one converted component is in memory at a time.
+    The calendar is not modified.
+    Joined, the bytes are the same as to_standard(...).to_ical().
+
+    See to_standard() for the arguments.
+    """
+    if timezone is None:
+        timezone = calendar.get(X_WR_TIMEZONE, None)
+    if timezone is not None and not isinstance(timezone, datetime.tzinfo):
+        timezone = zoneinfo.ZoneInfo(str(timezone))
+    header = calendar.copy().to_ical()
+    end = header.rindex(b"END:")
+    yield header[:end]
+    if timezone is None:
+        for component in calendar.subcomponents:
+            yield component_to_ical(component)
+    else:
+        if add_timezone_component:
+            yield timezone_components.get_ical(timezone, stats=stats)
+        walker = UTCChangingWalker(timezone, cache_size=cache_size, stats=stats)
+        for component in calendar.subcomponents:
+            yield component_to_ical(walker.walk_component(component))
+    yield header[end:]
+
+
+# The attribute of components with their bytes, see from_ical_keeping_sources().
+SOURCE_ATTRIBUTE = "x_wr_timezone_source"
+
+
+def from_ical_keeping_sources(data:bytes) -> icalendar.Calendar:
+    """Parse a calendar and remember the bytes of its top-level components.
+
+    to_ical_keeping_sources() writes these bytes instead of serializing
+    the components again if they did not change.
+    """
+    calendar = icalendar.Calendar.from_ical(data)
+    _, sources = split_calendar(data)
+    if len(sources) == len(calendar.subcomponents):
+        for component, source in zip(calendar.subcomponents, sources):
+            setattr(component, SOURCE_ATTRIBUTE, (source, component_state(component)))
+    return calendar
+
+
+def component_state(component) -> list:
+    """Return the components, property names and values of a component.
+
+    The values include what can be changed in place, like their
+    parameters and the dates of RDATE and EXDATE lists.
+    If they are identical later, the component did not change.
+    """
+    state = []
+    for subcomponent in component.walk():
+        state.append(subcomponent)
+        state.extend(subcomponent.keys())
+        for value in subcomponent.values():
+            add_value_state(value, state)
+    return state
+
+
+def add_value_state(value, state:list):
+    """Add the value and the objects inside of it to the state.
+
+    These are the items of lists and dicts like Parameters and vRecur
+    and the attributes like params, dt and dts.
+    """
+    state.append(value)
+    if isinstance(value, dict):
+        state.extend(value.keys())
+        children = value.values()
+    elif isinstance(value, list):
+        children = value
+    else:
+        children = ()
+    for child in children:
+        add_value_state(child, state)
+    attributes = getattr(value, "__dict__", None)
+    if attributes:
+        state.extend(attributes.keys())
+        for child in attributes.values():
+            add_value_state(child, state)
+
+
+def forget_source(component):
+    """Remove the bytes that from_ical_keeping_sources() remembered for the component."""
+    component.__dict__.pop(SOURCE_ATTRIBUTE, None)
+
+
+def component_to_ical(component) -> bytes:
+    """Return the bytes of the component.
+
+    The parsed bytes are used if the component did not change since
+    from_ical_keeping_sources().
+    """
+    source = getattr(component, SOURCE_ATTRIBUTE, None)
+    if source is not None:
+        data, state = source
+        if list_is(state, component_state(component)):
+            return data
+        forget_source(component)
+    return component.to_ical()
+
+
+def to_ical_keeping_sources(calendar:icalendar.Calendar) -> bytes:
+    """Serialize the calendar like calendar.to_ical().
+
+    The top-level components that did not change since
+    from_ical_keeping_sources() are written as they were parsed.
+    """
+    header = calendar.copy().to_ical()
+    end = header.rindex(b"END:")
+    return b"".join(itertools.chain(
+        [header[:end]], map(component_to_ical, calendar.subcomponents), [header[end:]]))
+
+
+def to_standard_ical_parallel(
+        data:bytes,
+        timezone:Optional[datetime.tzinfo]=None,
+        add_timezone_component:bool=False,
+        jobs:int=0,
+        chunk_size:int=1_000_000,
+        reuse_bytes:bool=False
+    ) -> bytes:
+    """Convert the bytes of a large calendar with several processes.
+
+    The components are split into chunks of about chunk_size bytes
+    after an END:VEVENT line.
+    The chunks are parsed and converted in jobs processes.
+    0 uses all the cores.
+    Each process gets the VTIMEZONE components of the calendar, too.
+    The results are put together in the order of the calendar.
+
+    The calendar properties are serialized again like to_standard_ical()
+    does so that the result does not depend on the size of the calendar.
+    See to_standard() for the other arguments.
+    """
+    first_component = FIRST_COMPONENT.search(data)
+    end = None
+    for end in CALENDAR_END.finditer(data):
+        pass
+    if first_component is None or end is None or end.start() < first_component.start():
+        return to_standard_ical(
+            data, timezone=timezone, add_timezone_component=add_timezone_component, reuse_bytes=reuse_bytes)
+    calendar = icalendar.Calendar.from_ical(data[:first_component.start()] + b"END:VCALENDAR\r\n")
+    if timezone is None:
+        timezone = calendar.get(X_WR_TIMEZONE, None)
+    if timezone is None:
+        # X-WR-TIMEZONE might come after the components.
+        return to_standard_ical(
+            data, add_timezone_component=add_timezone_component, reuse_bytes=reuse_bytes)
+    header = calendar.to_ical()
+    header_end = header.rindex(b"END:")
+    if not isinstance(timezone, datetime.tzinfo):
+        timezone = zoneinfo.ZoneInfo(str(timezone))
+    body = data[first_component.start():end.start()]
+    timezone_matches = TIMEZONE_COMPONENT.findall(body)
+    tasks = (
+        (None, (b"".join(timezone_matches), len(timezone_matches), chunk, timezone, reuse_bytes))
+        for chunk in split_after_events(body, chunk_size)
+    )
+    result = [header[:header_end]]
+    if add_timezone_component:
+        result.append(timezone_components.get_ical(timezone))
+    if jobs == 0:
+        jobs = os.cpu_count() or 1
+    with concurrent.futures.ProcessPoolExecutor(jobs) as executor:
+        for _, future in run_bounded(executor, to_standard_components, tasks, jobs * 2, ordered=True):
+            components = future.result()
+            if components is None:
+                executor.shutdown(cancel_futures=True)
+                return to_standard_ical(
+                    data, timezone=timezone, add_timezone_component=add_timezone_component, reuse_bytes=reuse_bytes)
+            result.append(components)
+    result.append(header[header_end:])
+    return b"".join(result)
+
+
+def split_after_events(body:bytes, chunk_size:int):
+    """Yield chunks of the body of about chunk_size bytes that end after END:VEVENT."""
+    start = 0
+    while start < len(body):
+        match = EVENT_END.search(body, start + chunk_size) if start + chunk_size < len(body) else None
+        end = len(body) if match is None else match.end()
+        yield body[start:end]
+        start = end
+
+
+def to_standard_components(timezones:bytes, skip:int, components:bytes, timezone:datetime.tzinfo, reuse_bytes:bool=False) -> Optional[bytes]:
+    """Convert the bytes of components with the time zone and return their bytes.
+
+    timezones are the bytes of the VTIMEZONE components needed to parse them.
+    skip is the number of these VTIMEZONE components.
+    If the components are not only components, None is returned.
+    reuse_bytes keeps the bytes of the components that do not change.
+    """
+    data = b"BEGIN:VCALENDAR\r\n" + timezones + components + b"END:VCALENDAR\r\n"
+    calendar = from_ical_keeping_sources(data) if reuse_bytes else icalendar.Calendar.from_ical(data)
+    if len(calendar):
+        return None
+    to_ical = component_to_ical if reuse_bytes else icalendar.Component.to_ical
+    walker = UTCChangingWalker(timezone, inplace=True)
+    return b"".join(to_ical(walker.walk_component(component)) for component in calendar.subcomponents[skip:])
+
+
+def to_standard_incremental(
+        previous_input:bytes,
+        previous_output:bytes,
+        new_input:bytes,
+        timezone:Optional[datetime.tzinfo]=None,
+        add_timezone_component:bool=False,
+        stats:Optional[ConversionStats]=None
+    ) -> bytes:
+    """Convert the bytes of a calendar again after it changed a bit.
+
+    Arguments:
+
+        previous_input: the bytes of the calendar that was converted before.
+
+        previous_output: the bytes of its conversion with the same arguments.
+
+        new_input: the bytes of the calendar to convert now.
+
+        timezone, add_timezone_component, stats: see to_standard_stream()
+
+    Components of new_input which are the same bytes as in previous_input
+    are taken from previous_output without parsing them.
+    Only the new and changed components are converted.
+    The result is the same as that of to_standard_stream().
+
+    The components of previous_input and previous_output are matched by
+    their position and checked by their UID.
+    If they do not match or X-WR-TIMEZONE changed, all components
+    are converted.
+    """
+    previous_timezone, previous_components = split_calendar(previous_input)
+    new_timezone = read_header(iter_content_lines(io.BytesIO(new_input)))[1]
+    converted_components = {}
+    if timezone is not None or previous_timezone == new_timezone:
+        converted_components = match_components(previous_components, split_calendar(previous_output)[1])
+    return b"".join(to_standard_stream(
+        io.BytesIO(new_input), timezone=timezone, add_timezone_component=add_timezone_component,
+        stats=stats, converted_components=converted_components))
+
+
+def split_calendar(data:bytes) -> tuple:
+    """Return the X-WR-TIMEZONE value and the bytes of the top-level components."""
+    lines = iter_content_lines(io.BytesIO(data))
+    _, x_wr_timezone, line = read_header(lines)
+    return x_wr_timezone, [data for is_component, data in iter_components(line, lines) if is_component]
+
+
+def component_identity(data:bytes) -> tuple:
+    """Return what the conversion does not change about a component in bytes.
+
+    These are the component name and the UIDs.
+    """
+    data = FOLDING.sub(b"", data)
+    return data.split(b"\n", 1)[0].strip().upper(), sorted(UID_LINE.findall(data))
+
+
+def match_components(inputs:list, outputs:list) -> dict:
+    """Map the bytes of input components to the bytes of their conversion.
+
+    outputs may start with a VTIMEZONE component added by the conversion.
+    If the components do not match, the result is empty.
+    """
+    if len(outputs) == len(inputs) + 1 and outputs[0][:15].upper() == b"BEGIN:VTIMEZONE":
+        outputs = outputs[1:]
+    if len(outputs) != len(inputs):
+        return {}
+    for input_component, output_component in zip(inputs, outputs):
+        if component_identity(input_component) != component_identity(output_component):
+            return {}
+    return dict(zip(inputs, outputs))
+
+
+def convert_file(in_path:str, out_path:str, add_timezone_component:bool=False, timezone:Optional[str]=None, trim_timezone_component:bool=False, window_start=None, window_end=None, reuse_bytes:bool=False):
+    """Convert the calendar file at in_path and write the result to out_path."""
+    with open(in_path, "rb") as in_file:
+        data = in_file.read()
+    data = to_standard_ical(
+        data, timezone=timezone, add_timezone_component=add_timezone_component,
+        trim_timezone_component=trim_timezone_component,
+        window_start=window_start, window_end=window_end, reuse_bytes=reuse_bytes)
+    with open(out_path, "wb") as out_file:
+        out_file.write(data)
+
+
+def iter_calendar_files(paths):
+    """Yield the paths and the .ics files inside of the directories in paths."""
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                file_path = os.path.join(path, name)
+                if name.lower().endswith(".ics") and os.path.isfile(file_path):
+                    yield file_path
+        else:
+            yield path
+
+
+def run_bounded(executor, function, tasks, max_pending:int, ordered:bool=False):
+    """Run function(*arguments) in the executor for the tasks.
+
+    tasks yields (key, arguments).
+    This yields (key, future) when the future is done.
+    At most max_pending futures are submitted at a time so that the tasks
+    are only created when they can run.
+    If ordered is true, the futures are yielded in the order of the tasks.
+    """
+    running = {}  # future: key
+    for key, arguments in tasks:
+        if len(running) >= max_pending:
+            if ordered:
+                future = next(iter(running))
+                concurrent.futures.wait([future])
+                done = [future]
+            else:
+                done, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                yield running.pop(future), future
+        running[executor.submit(function, *arguments)] = key
+    futures = running if ordered else concurrent.futures.as_completed(running)
+    for future in futures:
+        concurrent.futures.wait([future])
+        yield running[future], future
+
+
+ConversionResult = collections.namedtuple("ConversionResult", ["index", "calendar", "error"])
+ConversionResult.__doc__ = """The result of converting a calendar with to_standard_many().
+
+index is the position of the calendar in the input.
+calendar is the converted calendar or None if the conversion failed.
+error is the exception or None if the conversion succeeded.
+"""
+
+
+def to_standard_chunk(calendars:list, options:dict) -> list:
+    """Convert the calendars with to_standard() and return (calendar, error) for each."""
+    results = []
+    for calendar in calendars:
+        try:
+            results.append((to_standard(calendar, **options), None))
+        except Exception as error:
+            results.append((None, error))
+    return results
+
+
+def to_standard_many(
+        calendars,
+        executor:Optional[concurrent.futures.Executor]=None,
+        ordered:bool=True,
+        chunksize:int=1,
+        max_pending:Optional[int]=None,
+        timezone:Optional[datetime.tzinfo]=None,
+        add_timezone_component:bool=False,
+        trim_timezone_component:bool=False,
+        cache_size:Optional[int]=None
+    ):
+    """Convert many calendars with to_standard() and yield ConversionResults.
+
+    Arguments:
+
+        calendars: an iterable of icalendar.Calendar objects.
+            It is only consumed as fast as the calendars are converted.
+
+        executor: a concurrent.futures executor like a ThreadPoolExecutor or a
+            ProcessPoolExecutor. By default, the calendars are converted
+            one after the other.
+
+        ordered: whether the results are yielded in the order of the calendars.
+            If False, they are yielded as soon as they are converted.
+
+        chunksize: the number of calendars to convert in one task.
+            Larger chunks reduce the overhead of a ProcessPoolExecutor.
+
+        max_pending: the number of chunks to submit at a time.
+            By default, this is twice the number of cores.
+
+        timezone, add_timezone_component, trim_timezone_component, cache_size:
+            see to_standard()
+
+    A calendar that cannot be converted does not stop the conversion of
+    the others. Its error is in the result.
+    The time zone and its VTIMEZONE component are computed once
+    for all calendars.
+    """
+    if timezone is not None and not isinstance(timezone, datetime.tzinfo):
+        timezone = zoneinfo.ZoneInfo(str(timezone))
+    if add_timezone_component and timezone is not None:
+        timezone_components.warm([timezone])
+    options = dict(
+        timezone=timezone, add_timezone_component=add_timezone_component,
+        trim_timezone_component=trim_timezone_component, cache_size=cache_size)
+    chunks = iter_chunks(calendars, chunksize)
+    if executor is None:
+        for start, chunk in chunks:
+            for index, (calendar, error) in enumerate(to_standard_chunk(chunk, options), start):
+                yield ConversionResult(index, calendar, error)
+        return
+    if max_pending is None:
+        max_pending = 2 * (os.cpu_count() or 1)
+    tasks = (((start, len(chunk)), (chunk, options)) for start, chunk in chunks)
+    for (start, length), future in run_bounded(executor, to_standard_chunk, tasks, max_pending, ordered):
+        error = future.exception()
+        results = [(None, error)] * length if error is not None else future.result()
+        for index, (calendar, error) in enumerate(results, start):
+            yield ConversionResult(index, calendar, error)
 
-        cat in.ics | x-wr-timezone > out.ics
-        wget -O- https://example.org/in.ics | x-wr-timezone > out.ics
-        curl https://example.org/in.ics | x-wr-timezone > out.ics
 
-    Convert files:
+def iter_chunks(iterable, size:int):
+    """Yield (index of the first item, list of up to size items) for the iterable."""
+    iterator = iter(iterable)
+    start = 0
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield start, chunk
+        start += len(chunk)
 
-        x-wr-timezone in.ics out.ics
 
-    By default, x-wr-timezone will add a VTIMEZONE component to the result.
-    Use --no-vtimezone to remove it. (Added in v2.0.0)
+def convert_files(paths, output_dir:str, jobs:int=0, add_timezone_component:bool=False, timezone:Optional[str]=None, trim_timezone_component:bool=False, window_start=None, window_end=None, reuse_bytes:bool=False):
+    """Convert calendar files and directories into the output_dir.
 
-    Get help:
+    jobs is the number of processes to use. 0 uses all the cores.
+    This yields (path, error) when a file is converted.
+    error is None if the conversion was successful.
+    A failing file does not stop the conversion of the others.
+    Files with the same name as a file before them are not converted
+    and yield an error instead of overwriting its output.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    outputs = {}  # output file: path
+    tasks = []
+    for path in iter_calendar_files(paths):
+        output = os.path.join(output_dir, os.path.basename(path))
+        key = os.path.normcase(output)
+        if key not in outputs:
+            outputs[key] = path
+            tasks.append((path, (path, output, add_timezone_component, timezone, trim_timezone_component, window_start, window_end, reuse_bytes)))
+        elif outputs[key] != path:
+            yield path, ValueError("{} has the same name as {} in the output directory.".format(path, outputs[key]))
+    if jobs == 0:
+        jobs = os.cpu_count() or 1
+    if jobs == 1:
+        for path, task in tasks:
+            try:
+                convert_file(*task)
+            except Exception as error:
+                yield path, error
+            else:
+                yield path, None
+        return
+    if add_timezone_component and timezone is not None:
+        # Processes started with fork inherit the component.
+        timezone_components.warm([timezone])
+    with concurrent.futures.ProcessPoolExecutor(jobs) as executor:
+        for path, future in run_bounded(executor, convert_file, tasks, jobs * 2):
+            yield path, future.exception()
 
-        x-wr-timezone --help
 
-    For bug reports, code and questions, visit the projet page:
+def get_version() -> str:
+    """Return the version of this library."""
+    import importlib.metadata
+    try:
+        return importlib.metadata.version("x_wr_timezone")
+    except importlib.metadata.PackageNotFoundError:
+        return "unknown"
 
-        https://github.com/niccokunzmann/x-wr-timezone
 
-    License: LPGLv3+
+def copy_file(source, destination):
+    """Copy the content of the binary file source to destination.
+
+    The operating system copies the bytes if both are real files.
     """
-    calendar = icalendar.Calendar.from_ical(in_file.read())
-    new_cal = to_standard(calendar, add_timezone_component=add_timezone)
-    out_file.write(new_cal.to_ical())
-    return 0
+    try:
+        destination.flush()
+        source_fd = source.fileno()
+        destination_fd = destination.fileno()
+    except (AttributeError, OSError, ValueError):
+        shutil.copyfileobj(source, destination)
+        return
+    offset = 0
+    size = os.fstat(source_fd).st_size
+    try:
+        while offset < size:
+            sent = os.sendfile(destination_fd, source_fd, offset, size - offset)
+            if sent == 0:
+                break
+            offset += sent
+    except (AttributeError, OSError):
+        source.seek(offset)
+        shutil.copyfileobj(source, destination)
+
+
+class ConversionCache:
+    """A directory with converted calendars.
+
+    The files are named by the hash of the input and the options.
+    If the files in the directory are larger than max_size bytes,
+    the least recently used files are removed.
+    Files are written atomically so that several processes can share
+    the directory.
+    """
+
+    SUFFIX = ".ics"
+
+    def __init__(self, directory:str, max_size:int=100_000_000):
+        """Create a cache in the directory."""
+        self.directory = directory
+        self.max_size = max_size
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, data:bytes, **options) -> str:
+        """Return the key for the input data converted with the options."""
+        key = hashlib.sha256(data)
+        key.update(repr((get_version(), sorted(options.items()))).encode())
+        return key.hexdigest()
+
+    def path(self, key:str) -> str:
+        """Return the path of the file for the key."""
+        return os.path.join(self.directory, key + self.SUFFIX)
+
+    def open(self, key:str):
+        """Return the cached file opened for reading or None."""
+        path = self.path(key)
+        try:
+            file = open(path, "rb")
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return file
+
+    def store(self, key:str, data:bytes):
+        """Store the converted data and remove old files if needed."""
+        fd, temporary_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(data)
+            os.replace(temporary_path, self.path(key))
+        except BaseException:
+            os.remove(temporary_path)
+            raise
+        self.evict()
+
+    def evict(self):
+        """Remove the least recently used files until the cache is small enough."""
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(self.SUFFIX):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        size = sum(file[1] for file in files)
+        for _, file_size, path in sorted(files):
+            if size <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            size -= file_size
+
+
+timezone_components = TimezoneComponentCache()
+
+
+class AsyncConverter:
+    """Run conversions in an executor so that they do not block the event loop.
+
+    executor is a concurrent.futures executor.
+    By default, the default executor of the event loop is used.
+    max_concurrency limits the number of conversions that run at a time.
+    The others wait for them to finish.
+
+    Use a converter in one event loop only.
+    """
+
+    def __init__(self, executor:Optional[concurrent.futures.Executor]=None, max_concurrency:Optional[int]=None):
+        """Create a converter."""
+        self.executor = executor
+        self.max_concurrency = max_concurrency
+        self.semaphore = None
+
+    async def run(self, function, *args, **kw):
+        """Return function(*args, **kw) computed in the executor."""
+        if self.max_concurrency is None:
+            return await self.run_in_executor(function, *args, **kw)
+        if self.semaphore is None:
+            import asyncio
+            self.semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self.semaphore:
+            return await self.run_in_executor(function, *args, **kw)
+
+    async def run_in_executor(self, function, *args, **kw):
+        """Return function(*args, **kw) computed in the executor without waiting for others."""
+        import asyncio
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(function, *args, **kw))
+
+
+async def to_standard_async(calendar:icalendar.Calendar, converter:Optional[AsyncConverter]=None, **options) -> icalendar.Calendar:
+    """Run to_standard() in the converter without blocking the event loop.
+
+    See to_standard() for the options.
+    By default, the default executor of the event loop is used.
+    """
+    if converter is None:
+        converter = AsyncConverter()
+    return await converter.run(to_standard, calendar, **options)
+
+
+async def to_standard_ical_async(data:bytes, converter:Optional[AsyncConverter]=None, **options) -> bytes:
+    """Run to_standard_ical() in the converter without blocking the event loop."""
+    if converter is None:
+        converter = AsyncConverter()
+    return await converter.run(to_standard_ical, data, **options)
+
+
+async def to_standard_stream_async(
+        source,
+        timezone:Optional[datetime.tzinfo]=None,
+        add_timezone_component:bool=False,
+        converter:Optional[AsyncConverter]=None,
+        batch_size:int=65536
+    ):
+    """Convert a calendar from an asyncio.StreamReader or an async iterable of bytes.
+
+    This works like to_standard_stream() and yields the bytes of the result.
+    Components are collected until they have batch_size bytes.
+    Then, they are converted in the converter without blocking the event loop.
+    """
+    if converter is None:
+        converter = AsyncConverter()
+    lines = aiter_content_lines(source)
+    reader = CalendarLineReader()
+    line = None
+    async for line in lines:
+        if not reader.read_header_line(line):
+            break
+        line = None
+    yield b"".join(reader.header)
+    if timezone is None:
+        timezone = reader.x_wr_timezone
+    if timezone is not None and not isinstance(timezone, datetime.tzinfo):
+        timezone = zoneinfo.ZoneInfo(str(timezone))
+    if timezone is None:
+        if line is not None:
+            yield line
+        async for line in lines:
+            yield line
+        return
+    if add_timezone_component:
+        yield await converter.run(timezone_components.get_ical, timezone)
+    batch = []  # lines as bytes and components as (bytes,)
+    size = 0
+    async for line in aiter_after(line, lines):
+        result = reader.read_line(line)
+        if result is None:
+            continue
+        is_component, data = result
+        if is_component:
+            batch.append((data,))
+            size += len(data)
+        else:
+            batch.append(data)
+        if size >= batch_size:
+            yield await converter.run(to_standard_raw_batch, batch, timezone)
+            batch = []
+            size = 0
+    if batch:
+        yield await converter.run(to_standard_raw_batch, batch, timezone)
+
+
+def to_standard_raw_batch(batch:list, timezone:datetime.tzinfo) -> bytes:
+    """Convert the components in a batch of to_standard_stream_async() and return the bytes."""
+    walker = UTCChangingWalker(timezone)
+    return b"".join(
+        data if isinstance(data, bytes) else walker.walk_raw_component(data[0])
+        for data in batch
+    )
+
+
+async def aiter_after(line:Optional[bytes], lines):
+    """Yield line if it is not None and then the lines of an async iterator."""
+    if line is None:
+        return
+    yield line
+    async for line in lines:
+        yield line
+
+
+async def aiter_chunks(source, size:int=65536):
+    """Yield the chunks of bytes of an asyncio.StreamReader or an async iterable."""
+    if not hasattr(source, "read"):
+        async for chunk in source:
+            yield chunk
+        return
+    while True:
+        chunk = await source.read(size)
+        if not chunk:
+            return
+        yield chunk
+
+
+async def aiter_lines(source):
+    """Yield the lines of an asyncio.StreamReader or an async iterable of bytes.
+
+    Lines can be longer than the limit of StreamReader.readline().
+    """
+    rest = b""
+    async for chunk in aiter_chunks(source):
+        data = rest + chunk
+        start = 0
+        end = data.find(b"\n")
+        while end != -1:
+            yield data[start:end + 1]
+            start = end + 1
+            end = data.find(b"\n", start)
+        rest = data[start:]
+    if rest:
+        yield rest
+
+
+async def aiter_content_lines(source):
+    """Yield the content lines like iter_content_lines() but from an async source."""
+    parts = []
+    async for line in aiter_lines(source):
+        if parts and line[:1] in (b" ", b"\t"):
+            parts.append(line)
+            continue
+        if parts:
+            yield b"".join(parts)
+        parts = [line]
+    if parts:
+        yield b"".join(parts)
+
+
+class ConversionServer:
+    """An HTTP server which converts calendars of other servers.
+
+    Request a converted calendar like this:
+
+        GET /?url=https://example.org/in.ics
+
+    These query parameters are optional:
+
+        timezone=Europe/Berlin overrides X-WR-TIMEZONE
+        add_timezone=0 or 1 sets whether to add the VTIMEZONE component
+
+    The upstream calendar is downloaded for every request.
+    The conversion result is cached by the hash of the upstream bytes
+    and the options.
+    Concurrent requests for the same calendar share one download and
+    conversion.
+    Clients can use If-None-Match and If-Modified-Since.
+    """
+
+    SCHEMES = ("http://", "https://")
+
+    def __init__(self, add_timezone_component:bool=True, cache_size:int=128, timeout:float=30, converter:Optional[AsyncConverter]=None):
+        """Create a server.
+
+        cache_size is the number of converted calendars to keep.
+        timeout is the time in seconds to wait for upstream servers.
+        converter runs the conversions, see AsyncConverter.
+        By default, as many conversions as there are cores run at a time.
+        """
+        self.add_timezone_component = add_timezone_component
+        self.cache_size = cache_size
+        self.timeout = timeout
+        self.converter = AsyncConverter(max_concurrency=os.cpu_count() or 1) if converter is None else converter
+        self.cache = collections.OrderedDict()  # hash: (etag, last_modified, body)
+        self.requests = {}  # (url, options): task
+
+    def fetch(self, url:str) -> bytes:
+        """Download the calendar from the url."""
+        import urllib.request
+        with urllib.request.urlopen(url, timeout=self.timeout) as response:
+            return response.read()
+
+    async def convert(self, url:str, timezone:Optional[str], add_timezone_component:bool) -> tuple:
+        """Download and convert the calendar.
+
+        Returns (etag, last_modified, body)."""
+        import asyncio
+        loop = asyncio.get_running_loop()
+        data = await loop.run_in_executor(None, self.fetch, url)
+        key = hashlib.sha256(data)
+        key.update(repr((timezone, add_timezone_component)).encode())
+        key = key.hexdigest()
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            return self.cache[key]
+        body = await to_standard_ical_async(
+            data, self.converter, timezone=timezone, add_timezone_component=add_timezone_component)
+        result = self.cache[key] = ('"{}"'.format(key), int(time.time()), body)
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return result
+
+    async def get(self, url:str, timezone:Optional[str]=None, add_timezone_component:Optional[bool]=None) -> tuple:
+        """Return the converted calendar and wait for running conversions of it."""
+        import asyncio
+        if add_timezone_component is None:
+            add_timezone_component = self.add_timezone_component
+        key = (url, timezone, add_timezone_component)
+        task = self.requests.get(key)
+        if task is None:
+            task = self.requests[key] = asyncio.ensure_future(self.convert(*key))
+            task.add_done_callback(lambda task: self.requests.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def respond(self, method:str, target:str, headers:dict) -> tuple:
+        """Answer a request with (status, headers, body).
+
+        HEAD requests get the body of GET requests so that its length can
+        be sent. handle() does not send it.
+        """
+        import email.utils
+        import urllib.parse
+        if method not in ("GET", "HEAD"):
+            return "405 Method Not Allowed", {"Allow": "GET, HEAD"}, b""
+        query = urllib.parse.parse_qs(urllib.parse.urlsplit(target).query)
+        url = query.get("url", [""])[0]
+        if not url.startswith(self.SCHEMES):
+            return "400 Bad Request", {}, b"Use ?url=https://... to convert a calendar.\n"
+        timezone = query.get("timezone", [None])[0]
+        add_timezone_component = query.get("add_timezone", [None])[0]
+        if add_timezone_component is not None:
+            add_timezone_component = add_timezone_component not in ("0", "false", "no")
+        try:
+            etag, last_modified, body = await self.get(url, timezone, add_timezone_component)
+        except Exception as error:
+            return "502 Bad Gateway", {}, "{}: {}\n".format(type(error).__name__, error).encode("UTF-8")
+        response_headers = {
+            "Content-Type": "text/calendar; charset=utf-8",
+            "ETag": etag,
+            "Last-Modified": email.utils.formatdate(last_modified, usegmt=True),
+        }
+        if_none_match = headers.get("if-none-match")
+        if_modified_since = headers.get("if-modified-since")
+        if if_none_match is not None:
+            tags = [tag.strip() for tag in if_none_match.split(",")]
+            if "*" in tags or etag in tags or "W/" + etag in tags:
+                return "304 Not Modified", response_headers, b""
+        elif if_modified_since is not None:
+            try:
+                since = email.utils.parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                pass
+            else:
+                if last_modified <= since:
+                    return "304 Not Modified", response_headers, b""
+        return "200 OK", response_headers, body
+
+    async def handle(self, reader, writer):
+        """Handle one HTTP connection of an asyncio.StreamReader and asyncio.StreamWriter."""
+        try:
+            request_line = (await reader.readline()).decode("latin-1").split()
+            headers = {}
+            while True:
+                line = (await reader.readline()).decode("latin-1")
+                if not line.strip():
+                    break
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+            if len(request_line) != 3:
+                status, response_headers, body = "400 Bad Request", {}, b""
+            else:
+                status, response_headers, body = await self.respond(request_line[0], request_line[1], headers)
+            response_headers["Content-Length"] = str(len(body))
+            response_headers["Connection"] = "close"
+            head = "HTTP/1.1 {}\r\n".format(status) + "".join(
+                "{}: {}\r\n".format(name, value) for name, value in response_headers.items())
+            if request_line[:1] == ["HEAD"]:
+                body = b""
+            writer.write(head.encode("latin-1") + b"\r\n" + body)
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def start(self, host:str="127.0.0.1", port:int=8080):
+        """Start listening for requests and return the asyncio.Server."""
+        import asyncio
+        return await asyncio.start_server(self.handle, host, port)
+
+    async def serve_forever(self, host:str="127.0.0.1", port:int=8080):
+        """Serve until cancelled."""
+        server = await self.start(host, port)
+        async with server:
+            await server.serve_forever()
+
+
+def run_worker(
+        in_file,
+        out_file,
+        add_timezone_component:bool=True,
+        timezone:Optional[str]=None,
+        trim_timezone_component:bool=False,
+        window_start=None,
+        window_end=None,
+        reuse_bytes:bool=False
+    ):
+    """Convert calendars from in_file and write them to out_file until in_file ends.
+
+    This keeps the caches warm between the conversions.
+    Each request is a line with a JSON object followed by the calendar.
+    The object has these keys:
+
+        length: the number of bytes of the calendar after the line
+        timezone: optional, overrides X-WR-TIMEZONE
+        add_timezone: optional true or false, whether to add the VTIMEZONE component
+        trim_timezone: optional true or false, whether to trim the VTIMEZONE component
+        from, until: optional ISO dates or datetimes of the time window
+        reuse_bytes: optional true or false, whether to keep the bytes of unchanged components
+
+    The arguments are used for the keys that a request does not have,
+    see to_standard().
+
+    Each response is framed the same way.
+    Its object has the length of the result and an error which is None
+    if the conversion succeeded.
+    If a request line cannot be read, an error is written and the worker stops.
+    """
+    while True:
+        line = in_file.readline()
+        if not line:
+            return
+        if not line.strip():
+            continue
+        try:
+            request = json.loads(line)
+            length = int(request["length"])
+            if length < 0:
+                raise ValueError("length must not be negative.")
+        except (ValueError, TypeError, KeyError) as error:
+            write_worker_response(out_file, b"", "Bad request: {}".format(error))
+            return
+        data = in_file.read(length)
+        if len(data) < length:
+            write_worker_response(out_file, b"", "The calendar ended after {} of {} bytes.".format(len(data), length))
+            return
+        try:
+            result = to_standard_ical(
+                data,
+                timezone=request.get("timezone", timezone),
+                add_timezone_component=get_boolean(request, "add_timezone", add_timezone_component),
+                trim_timezone_component=get_boolean(request, "trim_timezone", trim_timezone_component),
+                window_start=parse_iso_datetime(request["from"]) if "from" in request else window_start,
+                window_end=parse_iso_datetime(request["until"]) if "until" in request else window_end,
+                reuse_bytes=get_boolean(request, "reuse_bytes", reuse_bytes),
+            )
+        except Exception as error:
+            write_worker_response(out_file, b"", "{}: {}".format(type(error).__name__, error))
+        else:
+            write_worker_response(out_file, result)
+
+
+def get_boolean(request:dict, key:str, default:bool) -> bool:
+    """Return the value of the key of a worker request or default if it is missing.
+
+    Values other than true and false raise a TypeError.
+    """
+    value = request.get(key, default)
+    if not isinstance(value, bool):
+        raise TypeError("{} must be true or false, not {}.".format(key, json.dumps(value)))
+    return value
+
+
+def write_worker_response(out_file, data:bytes, error:Optional[str]=None):
+    """Write a response of run_worker()."""
+    out_file.write(json.dumps({"length": len(data), "error": error}).encode() + b"\n")
+    out_file.write(data)
+    out_file.flush()
+
+
+def parse_iso_datetime(value:Optional[str]):
+    """Return the date or datetime of an ISO string or None."""
+    if value is None:
+        return None
+    if len(value) == 10:
+        return datetime.date.fromisoformat(value)
+    return datetime.datetime.fromisoformat(value)
+
+
+# The formats of --from and --until.
+DATETIME_FORMATS = ["%Y-%m-%d", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%dT%H:%M", "%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M"]
+
+
+@functools.cache
+def create_command_line():
+    """Create the x-wr-timezone command line interface.
+
+    click is only imported when the command line is used.
+    """
+    import click
+
+    @click.command()
+    @click.argument('files', nargs=-1, type=click.Path(allow_dash=True))
+    @click.version_option()
+    @click.help_option()
+    @click.option('--add-timezone/--no-timezone', default=True, help="Add a VTIMEZONE component to the result.")
+    @click.option('--stream', is_flag=True, default=False, help="Convert one component at a time to use little memory.")
+    @click.option('-o', '--output-dir', type=click.Path(file_okay=False), default=None, help="Convert all FILES and directories into this directory.")
+    @click.option('-j', '--jobs', type=click.IntRange(min=0), default=0, help="Number of processes to use with --output-dir and for large files. 0 uses all cores.")
+    @click.option('--serve', metavar="[HOST:]PORT", default=None, help="Run an HTTP server that converts calendars of other servers.")
+    @click.option('--timezone', default=None, help="Use this time zone instead of X-WR-TIMEZONE, e.g. Europe/Berlin.")
+    @click.option('--cache-dir', type=click.Path(file_okay=False), default=None, help="Reuse the results of earlier conversions stored in this directory.")
+    @click.option('--cache-size', type=click.IntRange(min=0), default=100_000_000, show_default=True, help="Maximum size of --cache-dir in bytes.")
+    @click.option('--trim-timezone', is_flag=True, default=False, help="Only add the time zone transitions of the years that the events use.")
+    @click.option('--stats', is_flag=True, default=False, help="Write the counters, times and memory of the conversion as JSON to stderr.")
+    @click.option('--from', 'window_start', type=click.DateTime(DATETIME_FORMATS), default=None, help="Remove the events that end before this date or time.")
+    @click.option('--until', 'window_end', type=click.DateTime(DATETIME_FORMATS), default=None, help="Remove the events that start at or after this date or time.")
+    @click.option('--reuse-bytes', is_flag=True, default=False, help="Copy the components that do not change instead of serializing them again.")
+    @click.option('--worker', is_flag=True, default=False, help="Convert many calendars framed with JSON lines from stdin to stdout.")
+    def main(files:tuple, add_timezone: bool, stream: bool, output_dir:Optional[str], jobs:int, serve:Optional[str], timezone:Optional[str], cache_dir:Optional[str], cache_size:int, trim_timezone:bool, stats:bool, window_start:Optional[datetime.datetime], window_end:Optional[datetime.datetime], reuse_bytes:bool, worker:bool):
+        """x-wr-timezone converts ICSfiles with X-WR-TIMEZONE to use RFC 5545 instead.
+
+        Convert input:
+
+            cat in.ics | x-wr-timezone > out.ics
+            wget -O- https://example.org/in.ics | x-wr-timezone > out.ics
+            curl https://example.org/in.ics | x-wr-timezone > out.ics
+
+        Convert files:
+
+            x-wr-timezone in.ics out.ics
+
+        By default, x-wr-timezone will add a VTIMEZONE component to the result.
+        Use --no-vtimezone to remove it. (Added in v2.0.0)
+
+        Add only the time zone transitions that the events need:
+
+            x-wr-timezone --trim-timezone in.ics out.ics
+
+        Convert large files with little memory:
+
+            x-wr-timezone --stream in.ics out.ics
+
+        Convert many files and directories with .ics files in parallel:
+
+            x-wr-timezone --output-dir out/ --jobs 4 in1.ics in2.ics calendars/
+
+        Reuse the results of earlier conversions of the same input:
+
+            x-wr-timezone --cache-dir ~/.cache/x-wr-timezone in.ics out.ics
+
+        Keep only the events of the next weeks:
+
+            x-wr-timezone --from 2025-01-01 --until 2025-02-01 in.ics out.ics
+
+        See where the time and memory go:
+
+            x-wr-timezone --stats in.ics out.ics
+
+        Copy the events that need no change instead of serializing them:
+
+            x-wr-timezone --reuse-bytes in.ics out.ics
+
+        Keep running and convert calendars sent on stdin, see run_worker():
+
+            x-wr-timezone --worker
+
+        Run a server on localhost that converts calendars from the web:
+
+            x-wr-timezone --serve 8080
+            curl 'http://localhost:8080/?url=https://example.org/in.ics'
+
+        Get help:
+
+            x-wr-timezone --help
+
+        For bug reports, code and questions, visit the projet page:
+
+            https://github.com/niccokunzmann/x-wr-timezone
+
+        License: LPGLv3+
+        """
+        if stats and (serve is not None or output_dir is not None):
+            raise click.UsageError("--stats can only be used to convert one calendar.")
+        if worker and (files or stream or output_dir is not None or serve is not None or stats):
+            raise click.UsageError("--worker reads from stdin and writes to stdout only.")
+        if serve is not None and (
+                files or stream or output_dir is not None or timezone is not None or cache_dir is not None
+                or trim_timezone or window_start is not None or window_end is not None or reuse_bytes):
+            raise click.UsageError("--serve can only be used with --add-timezone or --no-timezone.")
+        if serve is not None:
+            host, _, port = serve.rpartition(":")
+            if not port.isdigit():
+                raise click.BadParameter("Use PORT or HOST:PORT.", param_hint="--serve")
+            host = host or "127.0.0.1"
+            click.echo("Serving on http://{}:{}/?url=".format(host, port), err=True)
+            import asyncio
+            asyncio.run(ConversionServer(add_timezone).serve_forever(host, int(port)))
+            return 0
+        if cache_dir is not None:
+            timezone_components.use_directory(os.path.join(cache_dir, "vtimezone"))
+        if worker:
+            run_worker(
+                click.get_binary_stream("stdin"), click.get_binary_stream("stdout"),
+                add_timezone_component=add_timezone, timezone=timezone, trim_timezone_component=trim_timezone,
+                window_start=window_start, window_end=window_end, reuse_bytes=reuse_bytes)
+            return 0
+        if output_dir is not None:
+            failed = False
+            for path, error in convert_files(
+                    files, output_dir, jobs, add_timezone_component=add_timezone,
+                    timezone=timezone, trim_timezone_component=trim_timezone,
+                    window_start=window_start, window_end=window_end, reuse_bytes=reuse_bytes):
+                if error is not None:
+                    failed = True
+                    click.echo("ERROR: {}: {}".format(path, error), err=True)
+            if failed:
+                sys.exit(1)
+            return 0
+        if len(files) > 2:
+            raise click.UsageError("Use --output-dir to convert more than one file.")
+        if cache_dir is not None and stream:
+            raise click.UsageError("--cache-dir cannot be used with --stream.")
+        if trim_timezone and stream:
+            raise click.UsageError("--trim-timezone cannot be used with --stream.")
+        windowed = window_start is not None or window_end is not None
+        if windowed and stream:
+            raise click.UsageError("--from and --until cannot be used with --stream.")
+        in_path, out_path = files + ("-",) * (2 - len(files))
+        in_path = click.Path(exists=True, dir_okay=False, allow_dash=True).convert(
+            in_path, None, click.get_current_context())
+        conversion_stats = None
+        if stats:
+            conversion_stats = ConversionStats()
+            tracemalloc.start()
+        try:
+            # The output is opened when it is written so that it can be the input.
+            with click.open_file(in_path, "rb") as in_file, click.open_file(out_path, "wb", lazy=True) as out_file:
+                if stream:
+                    with measure(conversion_stats, "stream"):
+                        for chunk in to_standard_stream(
+                                in_file, timezone=timezone, add_timezone_component=add_timezone,
+                                stats=conversion_stats):
+                            out_file.write(chunk)
+                    return 0
+                with measure(conversion_stats, "read"):
+                    data = in_file.read()
+                def convert(data):
+                    if jobs != 1 and len(data) >= PARALLEL_MIN_SIZE and not trim_timezone and not stats and not windowed:
+                        return to_standard_ical_parallel(
+                            data, timezone=timezone, add_timezone_component=add_timezone, jobs=jobs,
+                            reuse_bytes=reuse_bytes)
+                    return to_standard_ical(
+                        data, timezone=timezone, add_timezone_component=add_timezone,
+                        trim_timezone_component=trim_timezone, stats=conversion_stats,
+                        window_start=window_start, window_end=window_end, reuse_bytes=reuse_bytes)
+                if cache_dir is None:
+                    out_file.write(convert(data))
+                    return 0
+                cache = ConversionCache(cache_dir, cache_size)
+                key = cache.key(
+                    data, add_timezone=add_timezone, timezone=timezone, trim_timezone=trim_timezone,
+                    window_start=window_start, window_end=window_end, reuse_bytes=reuse_bytes)
+                cached_file = cache.open(key)
+                if cached_file is None:
+                    data = convert(data)
+                    cache.store(key, data)
+                    out_file.write(data)
+                else:
+                    if conversion_stats is not None:
+                        conversion_stats.count("result_cache_hits")
+                    with cached_file:
+                        copy_file(cached_file, out_file)
+        finally:
+            if conversion_stats is not None:
+                tracemalloc.stop()
+                click.echo(conversion_stats.to_json(), err=True)
+        return 0
+
+    return main
+
+
+def __getattr__(name):
+    """Create the command line interface as main when it is accessed."""
+    if name == "main":
+        return create_command_line()
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
 
 
 __all__ = [
     "main", "to_standard", "UTCChangingWalker", "list_is",
     "X_WR_TIMEZONE", "CalendarWalker", "get_timezone_component",
+    "to_standard_stream", "iter_content_lines", "to_standard_ical",
+    "convert_file", "convert_files", "iter_calendar_files",
+    "TimezoneConverter", "ConversionServer", "ConversionCache",
+    "has_x_wr_timezone", "TimezoneComponentCache", "timezone_components",
+    "to_standard_many", "ConversionResult", "ConversionStats",
+    "to_standard_incremental", "iter_standard_ical", "to_standard_ical_parallel",
+    "LazyComponents", "TimeWindow", "run_worker",
+    "from_ical_keeping_sources", "to_ical_keeping_sources", "forget_source",
+    "AsyncConverter", "to_standard_async", "to_standard_ical_async",
+    "to_standard_stream_async",
 ]